@@ -0,0 +1,209 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import NecroEngine
+from NecroGrid import Grid
+from NecroMapObj import Map
+
+# -----------------------------------------------------------------------------
+
+
+class BatchResult(object):
+    """
+    One generated map in a compact form, its settings and
+    stats, with the cells as zlib compressed bytes. This is
+    what gets sent back from the worker processes.
+    """
+
+    __slots__ = ('height', 'width', 'seed', 'iterations_run', 'num_alive',
+                 'num_groups', 'cells')
+
+    # -------------------------------------------------------------------------
+
+
+    # constructor
+    def __init__(self, height, width, seed, iterations_run, num_alive,
+                 num_groups, cells):
+        self.height = height
+        self.width = width
+        self.seed = seed
+        self.iterations_run = iterations_run
+        self.num_alive = num_alive
+        self.num_groups = num_groups
+        self.cells = cells
+
+    # -------------------------------------------------------------------------
+
+
+    def __reduce__(self):
+        return (BatchResult, (self.height, self.width, self.seed,
+                              self.iterations_run, self.num_alive,
+                              self.num_groups, self.cells))
+
+    def __str__(self):
+        return '[{} by {}] seed {} with {} spaces in {} groups'.format(
+            self.height, self.width, self.seed, self.num_alive,
+            self.num_groups)
+
+    # -------------------------------------------------------------------------
+
+
+    # give back the grid of cells.
+    def grid(self):
+        return Grid(self.height, self.width,
+                    data=zlib.decompress(self.cells))
+
+    # -------------------------------------------------------------------------
+
+
+    # rebuild the whole map.
+    def to_map(self, engine='python', rules=None):
+        """
+        Build a Map back out of the result, the cells are
+        not regenerated but the groups are found again.
+        """
+
+        return Map.from_grid(self.grid(), engine, rules, self.seed,
+                             iterations_run=self.iterations_run)
+
+# -----------------------------------------------------------------------------
+
+
+class BatchStats(object):
+    """
+    Throughput numbers for a finished batch.
+    """
+
+    # constructor
+    def __init__(self, maps, cells, seconds, workers, chunks):
+        self.maps = maps
+        self.cells = cells
+        self.seconds = seconds
+        self.workers = workers
+        self.chunks = chunks
+
+    @property
+    def maps_per_second(self):
+        return self.maps / self.seconds if self.seconds else 0.0
+
+    @property
+    def cells_per_second(self):
+        return self.cells / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return ('{} maps ({} cells) in {:.2f}s on {} workers, '
+                '{:.1f} maps/s, {:.0f} cells/s').format(
+                    self.maps, self.cells, self.seconds, self.workers,
+                    self.maps_per_second, self.cells_per_second)
+
+# -----------------------------------------------------------------------------
+
+
+# make a list of jobs from a count and a base seed.
+def make_jobs(count, h, w, base_seed=0):
+    """
+    Return count (height, width, seed) jobs, with the seeds
+    counting up from base_seed.
+    """
+
+    return [(h, w, base_seed + n) for n in range(0, count)]
+
+# -----------------------------------------------------------------------------
+
+
+# generate one chunk of jobs, run inside a worker.
+def generate_chunk(jobs, engine, rules, iterations, connect):
+    """
+    Generate the map for every (height, width, seed) job in
+    the chunk and return them as BatchResults.
+    """
+
+    results = []
+
+    for h, w, seed in jobs:
+        m = Map(h, w, engine, rules, iterations, seed, connect)
+        results += [BatchResult(h, w, m.seed, m.iterations_run, m.num_alive,
+                                len(m.groups),
+                                zlib.compress(m.map.tobytes(), 1))]
+
+    return results
+
+# -----------------------------------------------------------------------------
+
+
+# generate a batch of maps across a pool of processes.
+def generate_batch(jobs, workers=None, chunksize=8, max_in_flight=None,
+                   engine='python', rules=None, iterations=2, connect=True):
+    """
+    Split the jobs into chunks of chunksize, and hand them
+    out to a pool of worker processes, keeping at most
+    max_in_flight chunks queued at once (twice the workers
+    by default) so memory stays bounded. Returns the list
+    of BatchResults, in the same order as the jobs, and the
+    BatchStats for the run.
+    """
+
+    jobs = list(jobs)
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * workers
+
+    chunks = [jobs[n:n+chunksize] for n in range(0, len(jobs), chunksize)]
+    done = [None] * len(chunks)
+
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+
+        pending = {}
+        next_chunk = 0
+
+        while next_chunk < len(chunks) or pending:
+
+            # top up the queue to the in flight limit.
+            while next_chunk < len(chunks) and len(pending) < max_in_flight:
+                future = pool.submit(generate_chunk, chunks[next_chunk],
+                                     engine, rules, iterations, connect)
+                pending[future] = next_chunk
+                next_chunk += 1
+
+            # wait for at least one chunk to come back.
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                done[pending.pop(future)] = future.result()
+
+    seconds = time.perf_counter() - start
+
+    results = [r for chunk in done for r in chunk]
+    stats = BatchStats(len(results), sum(h * w for h, w, _ in jobs),
+                       seconds, workers, len(chunks))
+
+    return results, stats
+
+# -----------------------------------------------------------------------------
+
+
+# if this file is run
+if __name__ == '__main__':
+
+    engine = 'numpy' if NecroEngine.numpy else 'bitboard'
+    results, stats = generate_batch(make_jobs(64, 48, 96), engine=engine)
+    print(stats)
+    print(results[0])
+
+# -----------------------------------------------------------------------------
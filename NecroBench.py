@@ -0,0 +1,274 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+
+import NecroEngine
+from NecroMapObj import Map
+
+# -----------------------------------------------------------------------------
+
+
+# the sizes run by default, as (height, width).
+SIZES = [(24, 48), (256, 256), (1024, 1024), (4096, 4096)]
+
+# the seed every run starts from.
+SEED = 1234
+
+# -----------------------------------------------------------------------------
+
+
+# the stages of making a map, in the order they run. each
+# one is given the half built map and does one step on it.
+def stage_blank_array(m):
+    m.map = m.blank_array()
+
+def stage_get_neighbors(m):
+    m.neighbors = m.get_neighbors()
+
+def stage_game_of_life(m):
+    m.game_of_life()
+
+def stage_get_groupings(m):
+    m.groups = m.get_groupings()
+
+def stage_connect_groups(m):
+    if m.connect_groups():
+        m.groups = m.get_groupings()
+
+def stage_make_group_map(m):
+    m.make_group_map()
+
+def stage_print_map(m):
+    m.print_map()
+
+def stage_print_neighbors(m):
+    m.print_neighbors()
+
+def stage_print_groups(m):
+    m.print_groups()
+
+STAGES = [
+    ('blank_array', stage_blank_array),
+    ('get_neighbors', stage_get_neighbors),
+    ('game_of_life', stage_game_of_life),
+    ('get_groupings', stage_get_groupings),
+    ('connect_groups', stage_connect_groups),
+    ('make_group_map', stage_make_group_map),
+    ('print_map', stage_print_map),
+    ('print_neighbors', stage_print_neighbors),
+    ('print_groups', stage_print_groups),
+]
+
+# -----------------------------------------------------------------------------
+
+
+# make an empty map to run the stages on.
+def empty_map(h, w, engine, seed):
+    """
+    Return a map with its settings in place, but without
+    any of its cells made yet.
+    """
+
+    m = Map.__new__(Map)
+    m.setup(h, w, engine, None, seed)
+    return m
+
+# -----------------------------------------------------------------------------
+
+
+# time one call, with or without tracing memory.
+def measure(fun, arg, memory):
+    """
+    Call fun(arg) and return (seconds, allocations, peak),
+    where allocations is the count of blocks the call
+    allocated and still held when it returned (summed per
+    line from a tracemalloc snapshot diff) and peak is the
+    most memory traced during the call. Both are None when
+    memory is not being traced, tracing slows down the call
+    a lot, so the seconds are only trusted from untraced
+    calls.
+    """
+
+    if memory:
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+
+    start = time.perf_counter()
+
+    fun(arg)
+
+    seconds = time.perf_counter() - start
+
+    allocations = peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        allocations = sum(max(0, d.count_diff)
+                          for d in after.compare_to(before, 'lineno'))
+
+    return seconds, allocations, peak
+
+# -----------------------------------------------------------------------------
+
+
+# run every stage, and then the whole constructor, once.
+def run_once(h, w, engine, seed, memory):
+    """
+    Return a dict of stage name to (seconds, allocations, peak)
+    for one run at the given size.
+    """
+
+    out = {}
+
+    m = empty_map(h, w, engine, seed)
+    for name, fun in STAGES:
+        out[name] = measure(fun, m, memory)
+
+    out['Map'] = measure(lambda _: Map(h, w, engine, seed=seed), None,
+                         memory)
+
+    return out
+
+# -----------------------------------------------------------------------------
+
+
+# benchmark one engine at one size.
+def bench(h, w, engine, seed=SEED, repeat=1, memory=True):
+    """
+    Run all the stages repeat times and keep the fastest
+    time of each, then if memory is set, run them once more
+    while tracing memory for the allocations and peaks.
+    Returns a list of result dicts, one per stage.
+    """
+
+    runs = [run_once(h, w, engine, seed, False) for _ in range(0, repeat)]
+    traced = run_once(h, w, engine, seed, True) if memory else None
+
+    results = []
+    for name in [s[0] for s in STAGES] + ['Map']:
+        best = min(runs, key=lambda r: r[name][0])[name]
+        results += [{
+            'engine': engine,
+            'height': h,
+            'width': w,
+            'stage': name,
+            'seconds': best[0],
+            'allocations': traced[name][1] if traced else None,
+            'peak_bytes': traced[name][2] if traced else None,
+        }]
+
+    return results
+
+# -----------------------------------------------------------------------------
+
+
+# line up two sets of results and show the change.
+def compare(old, new):
+    """
+    Return a list of lines, one per stage found in both sets
+    of results, with the old and new times and the speedup.
+    """
+
+    def key(r):
+        return (r['engine'], r['height'], r['width'], r['stage'])
+
+    before = {key(r): r for r in old['results']}
+    lines = []
+
+    for r in new['results']:
+        o = before.get(key(r))
+        if o is None:
+            continue
+        speedup = o['seconds'] / r['seconds'] if r['seconds'] else 0.0
+        lines += ['{:<8} {:>5}x{:<5} {:<16} {:>10.4f}s {:>10.4f}s {:>7.2f}x'
+                  .format(r['engine'], r['height'], r['width'], r['stage'],
+                          o['seconds'], r['seconds'], speedup)]
+
+    return lines
+
+# -----------------------------------------------------------------------------
+
+
+# read sizes written out as HxW,HxW.
+def parse_sizes(text):
+    return [tuple(int(n) for n in size.split('x')) for size in text.split(',')]
+
+# -----------------------------------------------------------------------------
+
+
+# this is main
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(
+        description='time each stage of making a map')
+    parser.add_argument('--sizes', type=parse_sizes, default=SIZES,
+                        help='sizes to run, as HxW,HxW (default: {})'.format(
+                            ','.join('{}x{}'.format(*s) for s in SIZES)))
+    parser.add_argument('--engine', action='append',
+                        choices=sorted(NecroEngine.ENGINES),
+                        help='engine to run, can be given more than once '
+                             '(default: numpy if installed, else bitboard)')
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='runs per size, the fastest is kept')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='skip the traced run for allocations and '
+                             'peak memory')
+    parser.add_argument('--output', default='necro_bench.json',
+                        help='file to save the results in')
+    parser.add_argument('--compare', metavar='OLD',
+                        help='results file to compare against')
+    args = parser.parse_args(argv)
+
+    engines = args.engine or ['numpy' if NecroEngine.numpy else 'bitboard']
+
+    results = []
+    for engine in engines:
+        for h, w in args.sizes:
+            for r in bench(h, w, engine, args.seed, args.repeat,
+                           not args.no_memory):
+                print('{engine:<8} {height:>5}x{width:<5} {stage:<16} '
+                      '{seconds:>10.4f}s {allocations} allocations '
+                      '{peak_bytes} peak bytes'.format(**r))
+                results += [r]
+
+    out = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'time': time.time(),
+        'seed': args.seed,
+        'results': results,
+    }
+
+    with open(args.output, 'w') as f:
+        json.dump(out, f, indent=1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            print('\n'.join(compare(json.load(f), out)))
+
+# -----------------------------------------------------------------------------
+
+
+if __name__ == '__main__':
+    main()
+
+# -----------------------------------------------------------------------------
@@ -0,0 +1,203 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+
+import os
+import hashlib
+from collections import OrderedDict
+
+import NecroFile
+import NecroEngine
+from NecroGrid import Grid
+from NecroMapObj import Map
+
+# -----------------------------------------------------------------------------
+
+
+class MapCache(object):
+    """
+    Caches generated maps by the parameters that made them,
+    (height, width, seed, rules, iterations, connect, noise,
+    density). The recently used maps are kept in memory, up
+    to maxsize of them, and if a path is given every map is
+    also saved in that folder so it can be loaded again
+    later instead of regenerated.
+    Maps are kept as their raw cells, and a new Map is built
+    for every get, so callers can change it freely.
+    """
+
+    # -------------------------------------------------------------------------
+
+
+    # constructor
+    def __init__(self, maxsize=128, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.memory = OrderedDict()
+
+        # counters for how each get was served.
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    # -------------------------------------------------------------------------
+
+
+    # make the key for a set of parameters.
+    def key(self, h, w, seed, rules, iterations, connect, noise, density):
+        """
+        Return the tuple the cache is keyed on, with the
+        rules turned into their 'B4/S234' form.
+        """
+
+        return (h, w, seed, str(NecroEngine.make_rules(rules)), iterations,
+                bool(connect), noise, float(density))
+
+    # -------------------------------------------------------------------------
+
+
+    # get a map, generating it only if it is not cached.
+    def get_map(self, h, w, seed, rules=None, iterations=2,
+                engine='python', connect=True, noise='white', density=0.5):
+        """
+        Return a map for the given parameters, from memory,
+        then from disk, and only then by generating it. A
+        seed of None makes a new random map every time, so
+        it is never cached.
+        """
+
+        if seed is None:
+            self.misses += 1
+            return Map(h, w, engine, rules, iterations, connect=connect,
+                       density=density, noise=noise)
+
+        key = self.key(h, w, seed, rules, iterations, connect, noise, density)
+
+        # check the memory tier first.
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return self.build(key, entry, engine)
+
+        # then the disk tier.
+        entry = self.load(key)
+        if entry is not None:
+            self.disk_hits += 1
+            self.remember(key, entry)
+            return self.build(key, entry, engine)
+
+        # else make the map, and save it in both tiers.
+        self.misses += 1
+        m = Map(h, w, engine, rules, iterations, seed, connect,
+                density=density, noise=noise)
+
+        entry = (m.map.tobytes(), m.neighbors.tobytes(), m.iterations_run)
+        self.remember(key, entry)
+        self.save(key, entry)
+
+        return m
+
+    # -------------------------------------------------------------------------
+
+
+    # build a map out of a cache entry.
+    def build(self, key, entry, engine):
+        """
+        Rebuild the map that a cache entry was saved from,
+        with the same settings a newly made one would have.
+        """
+
+        h, w, seed, rules = key[:4]
+        connect, noise, density = key[5:]
+        cells, neighbors, iterations_run = entry
+
+        m = Map.from_grid(Grid(h, w, data=cells), engine, rules, seed,
+                          Grid(h, w, data=neighbors), iterations_run,
+                          connect)
+        m.noise = noise
+        m.density = density
+        return m
+
+    # -------------------------------------------------------------------------
+
+
+    # put an entry into the memory tier.
+    def remember(self, key, entry):
+        """
+        Add an entry to memory, dropping the least recently
+        used entries past maxsize.
+        """
+
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+
+        while len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
+
+    # -------------------------------------------------------------------------
+
+
+    # the file a key is saved in.
+    def file_name(self, key):
+        """
+        Return the path of the file for a key, named by a
+        hash of the key.
+        """
+
+        name = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.path, name + '.cells')
+
+    # -------------------------------------------------------------------------
+
+
+    # read an entry from the disk tier.
+    def load(self, key):
+        """
+        Return the entry saved on disk for a key, or None if
+        there is no disk tier or nothing saved for it. The
+        file keeps the key, which guards against a hash
+        collision (see NecroFile.read_cells).
+        """
+
+        if self.path is None:
+            return None
+
+        return NecroFile.read_cells(self.file_name(key), key)
+
+    # -------------------------------------------------------------------------
+
+
+    # write an entry to the disk tier.
+    def save(self, key, entry):
+        """
+        Save an entry on disk as a NecroFile cells file.
+        """
+
+        if self.path is None:
+            return
+
+        NecroFile.write_cells(self.file_name(key), key, key[0], key[1],
+                              *entry)
+
+    # -------------------------------------------------------------------------
+
+
+    # empty out the memory tier.
+    def clear(self):
+        self.memory.clear()
+
+# -----------------------------------------------------------------------------
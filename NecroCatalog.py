@@ -0,0 +1,249 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+
+import sqlite3
+import zlib
+
+from NecroGrid import Grid
+from NecroMapObj import Map
+
+# -----------------------------------------------------------------------------
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS maps (
+    id INTEGER PRIMARY KEY,
+    height INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    seed INTEGER NOT NULL,
+    rules TEXT NOT NULL,
+    iterations_run INTEGER NOT NULL,
+    num_alive INTEGER NOT NULL,
+    num_groups INTEGER NOT NULL,
+    openness REAL NOT NULL,
+    largest_group INTEGER NOT NULL,
+    cells BLOB NOT NULL);
+
+CREATE TABLE IF NOT EXISTS groups (
+    map_id INTEGER NOT NULL REFERENCES maps(id) ON DELETE CASCADE,
+    label INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    top INTEGER NOT NULL,
+    left INTEGER NOT NULL,
+    bottom INTEGER NOT NULL,
+    right INTEGER NOT NULL,
+    PRIMARY KEY (map_id, label)) WITHOUT ROWID;
+
+-- the two indexes find() searches by carry every column it
+-- hands back, so a match never has to read the maps row.
+CREATE INDEX IF NOT EXISTS maps_by_groups ON maps (
+    num_groups, openness, height, width, seed, rules, iterations_run,
+    num_alive, largest_group);
+CREATE INDEX IF NOT EXISTS maps_by_size ON maps (
+    height, width, num_groups, openness, seed, rules, iterations_run,
+    num_alive, largest_group);
+CREATE INDEX IF NOT EXISTS maps_by_seed ON maps (seed);
+CREATE INDEX IF NOT EXISTS groups_by_size ON groups (size);
+"""
+
+# the columns handed back by find().
+MAP_COLUMNS = ('id', 'height', 'width', 'seed', 'rules', 'iterations_run',
+               'num_alive', 'num_groups', 'openness', 'largest_group')
+
+# -----------------------------------------------------------------------------
+
+
+class MapCatalog(object):
+    """
+    A store of generated maps in a sqlite database. Every
+    map gets a row with its settings and stats and its cells
+    as a compressed blob, and every group in it gets a row
+    with its size and bounding box, so maps can be searched
+    by shape without loading any of them.
+    """
+
+    # -------------------------------------------------------------------------
+
+
+    # constructor
+    def __init__(self, path=':memory:'):
+        self.connection = sqlite3.connect(path)
+
+        # WAL lets readers carry on while a batch is written.
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('PRAGMA foreign_keys=ON')
+        self.connection.executescript(SCHEMA)
+
+    # -------------------------------------------------------------------------
+
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    # -------------------------------------------------------------------------
+
+
+    # add a batch of maps.
+    def add_maps(self, maps):
+        """
+        Insert all of the maps, and all of their groups, with
+        one executemany per table inside of one transaction.
+        Returns the list of ids given to the maps.
+        """
+
+        maps = list(maps)
+
+        with self.connection:
+
+            # take the write lock before picking the ids, so
+            # nobody else can pick the same ones.
+            self.connection.execute('BEGIN IMMEDIATE')
+            first = self.connection.execute(
+                'SELECT COALESCE(MAX(id), 0) + 1 FROM maps').fetchone()[0]
+            ids = list(range(first, first + len(maps)))
+
+            self.connection.executemany(
+                'INSERT INTO maps VALUES (?,?,?,?,?,?,?,?,?,?,?)',
+                (self.map_row(i, m) for i, m in zip(ids, maps)))
+
+            self.connection.executemany(
+                'INSERT INTO groups VALUES (?,?,?,?,?,?,?)',
+                ((i, g_num + 1, len(g)) + tuple(g.bbox)
+                 for i, m in zip(ids, maps)
+                 for g_num, g in enumerate(m.groups)))
+
+        return ids
+
+    # -------------------------------------------------------------------------
+
+
+    # add a single map.
+    def add_map(self, m):
+        return self.add_maps([m])[0]
+
+    # -------------------------------------------------------------------------
+
+
+    # make the maps row for a map.
+    def map_row(self, map_id, m):
+        """
+        Return the values inserted into the maps table for
+        the map (m).
+        """
+
+        largest = max([len(g) for g in m.groups] or [0])
+
+        return (map_id, m.height, m.width, m.seed, str(m.rules),
+                m.iterations_run, m.num_alive, len(m.groups),
+                m.num_alive / (m.height * m.width), largest,
+                zlib.compress(m.map.tobytes()))
+
+    # -------------------------------------------------------------------------
+
+
+    # search for maps by their stats.
+    def find(self, num_groups=None, min_openness=None, max_openness=None,
+             height=None, width=None, min_largest_group=None, limit=None):
+        """
+        Return a dict of the stats of every map that matches
+        all of the given conditions, ordered by id.
+        """
+
+        where = []
+        args = []
+
+        for column, op, value in (('num_groups', '=', num_groups),
+                                  ('openness', '>=', min_openness),
+                                  ('openness', '<=', max_openness),
+                                  ('height', '=', height),
+                                  ('width', '=', width),
+                                  ('largest_group', '>=', min_largest_group)):
+            if value is not None:
+                where += ['{} {} ?'.format(column, op)]
+                args += [value]
+
+        sql = 'SELECT {} FROM maps'.format(', '.join(MAP_COLUMNS))
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY id'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            args += [limit]
+
+        return [dict(zip(MAP_COLUMNS, row))
+                for row in self.connection.execute(sql, args)]
+
+    # -------------------------------------------------------------------------
+
+
+    # get the group stats of a map.
+    def groups(self, map_id):
+        """
+        Return a list of (label, size, (top, left, bottom,
+        right)) for every group in the map.
+        """
+
+        rows = self.connection.execute(
+            'SELECT label, size, top, left, bottom, right FROM groups '
+            'WHERE map_id = ? ORDER BY label', (map_id,))
+
+        return [(row[0], row[1], tuple(row[2:])) for row in rows]
+
+    # -------------------------------------------------------------------------
+
+
+    # load a map back out of the catalog.
+    def load(self, map_id, engine='python'):
+        """
+        Rebuild the map with the given id from its stored
+        cells, or return None if there is no such map.
+        """
+
+        row = self.connection.execute(
+            'SELECT height, width, seed, rules, iterations_run, cells '
+            'FROM maps WHERE id = ?', (map_id,)).fetchone()
+
+        if row is None:
+            return None
+
+        h, w, seed, rules, iterations_run, cells = row
+        return Map.from_grid(Grid(h, w, data=zlib.decompress(cells)),
+                             engine, rules, seed,
+                             iterations_run=iterations_run)
+
+    # -------------------------------------------------------------------------
+
+
+    # drop a map and its groups.
+    def remove(self, map_id):
+        with self.connection:
+            self.connection.execute('DELETE FROM maps WHERE id = ?',
+                                    (map_id,))
+
+    # -------------------------------------------------------------------------
+
+
+    # count the maps in the catalog.
+    def __len__(self):
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM maps').fetchone()[0]
+
+# -----------------------------------------------------------------------------
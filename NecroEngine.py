@@ -0,0 +1,627 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from array import array
+
+from NecroGrid import Grid
+
+# -----------------------------------------------------------------------------
+
+
+class Rules(object):
+    """
+    Birth and survival rules for the game of life, with the
+    walls being the alive type of cell and n being the count
+    of space cells around a cell. A space becomes a wall if
+    n is in birth, a wall stays one if n is in survival, and
+    every other cell turns into a space.
+    """
+
+    __slots__ = ('birth', 'survival')
+
+    # -------------------------------------------------------------------------
+
+
+    # constructor
+    def __init__(self, birth=(4,), survival=(2, 3, 4)):
+        self.birth = frozenset(birth)
+        self.survival = frozenset(survival)
+
+        assert all(0 <= n <= 8 for n in self.birth | self.survival), \
+            'neighbor counts go from 0 to 8'
+
+    # -------------------------------------------------------------------------
+
+
+    # read rules written out as 'B4/S234'.
+    @classmethod
+    def parse(cls, text):
+        """
+        Build rules out of the usual B/S notation, such as
+        'B4/S234', the digits being neighbor counts.
+        """
+
+        try:
+            b, s = text.upper().split('/')
+            assert b[0] == 'B' and s[0] == 'S'
+            return cls([int(n) for n in b[1:]], [int(n) for n in s[1:]])
+        except (ValueError, IndexError, AssertionError):
+            raise ValueError('bad rules {!r}, expected B<digits>/S<digits>'
+                             .format(text))
+
+    # -------------------------------------------------------------------------
+
+
+    # make a table of what each cell turns into.
+    def table(self, wall_val, space_val):
+        """
+        Return a dict mapping a cell's value to a list of 9
+        values, the value the cell takes for each count of
+        space neighbors.
+        """
+
+        return {
+            wall_val: [wall_val if n in self.survival else space_val
+                       for n in range(0, 9)],
+            space_val: [wall_val if n in self.birth else space_val
+                        for n in range(0, 9)],
+        }
+
+    # -------------------------------------------------------------------------
+
+
+    def __eq__(self, o):
+        if not isinstance(o, Rules):
+            return NotImplemented
+        return (self.birth, self.survival) == (o.birth, o.survival)
+
+    def __hash__(self):
+        return hash((self.birth, self.survival))
+
+    def __reduce__(self):
+        return (Rules, (tuple(sorted(self.birth)),
+                        tuple(sorted(self.survival))))
+
+    def __str__(self):
+        return 'B{}/S{}'.format(''.join(str(n) for n in sorted(self.birth)),
+                                ''.join(str(n) for n in sorted(self.survival)))
+
+    def __repr__(self):
+        return 'Rules.parse({!r})'.format(str(self))
+
+# -----------------------------------------------------------------------------
+
+
+# the rules maps have always been made with.
+DEFAULT_RULES = Rules()
+
+# -----------------------------------------------------------------------------
+
+
+# turn a rules argument into Rules.
+def make_rules(rules):
+    """
+    Accept None (the default rules), a Rules object, or a
+    'B4/S234' style string, and return a Rules object.
+    """
+
+    if rules is None:
+        return DEFAULT_RULES
+    elif isinstance(rules, Rules):
+        return rules
+
+    return Rules.parse(rules)
+
+# -----------------------------------------------------------------------------
+
+
+class PythonEngine(object):
+    """
+    The reference engine, walks the map one cell at a time
+    using plain python loops.
+    """
+
+    name = 'python'
+
+    # -------------------------------------------------------------------------
+
+
+    # pulls an array of neighbor counts and returns it.
+    def get_neighbors(self, m):
+        """
+        Pulls all the neighbor counts from all of the cells
+        inside of the map array. It then stores all of them
+        into an array which is then returned.
+        """
+
+        # make a grid to hold the counts.
+        neighbors = Grid(m.height, m.width)
+
+        # go through all of the cells in the map array, and
+        # store the amount of neighbors each item has.
+        for j in range(0, m.height):
+
+            row = neighbors[j]
+
+            for i in range(0, m.width):
+                row[i] = m.get_point_neighbor(j, i)
+
+        return neighbors
+
+    # -------------------------------------------------------------------------
+
+
+    # run one pass of the game of life over the map.
+    def game_of_life(self, m):
+        """
+        Snakes through the neighbors array, and checks the
+        values of different cooridnates, based on the given
+        value and the map's rules, it either: dies, grows, or
+        lives. Then it updates the neighbors array, and
+        returns the number of cells that changed.
+        """
+
+        # update the number of neighbors for all coords.
+        m.neighbors = self.get_neighbors(m)
+        table = m.rules.table(m.wall_val, m.space_val)
+        changed = 0
+
+        # go through all of the cells in the map,. and play
+        # the Game of Life, with them based off neighbors.
+        for j in range(0, m.height):
+
+            row = m.map[j]
+            counts = m.neighbors[j]
+
+            for i in range(0, m.width):
+
+                new = table[row[i]][counts[i]]
+                if new != row[i]:
+                    row[i] = new
+                    changed += 1
+
+        # update the number of neighbors for all coords.
+        m.neighbors = self.get_neighbors(m)
+        return changed
+
+# -----------------------------------------------------------------------------
+
+
+class NumpyEngine(object):
+    """
+    Vectorized engine, counts the neighbors of every cell
+    with eight shifted slices of a padded array and looks up
+    the new value of every cell in the rule table at once.
+    """
+
+    name = 'numpy'
+
+    # -------------------------------------------------------------------------
+
+
+    def __init__(self):
+        if numpy is None:
+            raise ImportError('the numpy engine needs numpy installed')
+
+    # -------------------------------------------------------------------------
+
+
+    # view a grid as a 2d array, sharing its memory.
+    def view(self, grid):
+        """
+        Wrap the flat data of a grid in an array without
+        copying it, writes to the array land in the grid.
+        """
+
+        return numpy.frombuffer(grid.data, dtype=grid.typecode).reshape(
+            grid.height, grid.width)
+
+    # -------------------------------------------------------------------------
+
+
+    # count the space neighbors of every cell in one go.
+    def count(self, m, a):
+        """
+        Given the map as an array (a), pad it with a ring of
+        non-space cells so the edges count nothing outside
+        of the map, then sum the eight shifted windows.
+        """
+
+        p = numpy.pad((a == m.space_val).astype(numpy.uint8), 1)
+
+        return (p[:-2, :-2] + p[:-2, 1:-1] + p[:-2, 2:] +
+                p[1:-1, :-2] + p[1:-1, 2:] +
+                p[2:, :-2] + p[2:, 1:-1] + p[2:, 2:])
+
+    # -------------------------------------------------------------------------
+
+
+    # pulls an array of neighbor counts and returns it.
+    def get_neighbors(self, m):
+        """
+        Returns the neighbor counts as a grid, the same as
+        the python engine hands back.
+        """
+
+        n = self.count(m, self.view(m.map))
+        return Grid(m.height, m.width, data=n.tobytes())
+
+    # -------------------------------------------------------------------------
+
+
+    # run one pass of the game of life over the map.
+    def game_of_life(self, m):
+        """
+        Counts all neighbors up front, then looks up the new
+        value of every cell in the rule table at once, and
+        recounts the neighbors. Returns the number of cells
+        that changed.
+        """
+
+        a = self.view(m.map)
+        n = self.count(m, a)
+
+        # index the table by (value, count) for all cells.
+        table = m.rules.table(m.wall_val, m.space_val)
+        lut = numpy.zeros((max(table) + 1, 9), dtype=a.dtype)
+        for v, row in table.items():
+            lut[v] = row
+        new = lut[a, n]
+
+        # write the result straight into the map's grid.
+        changed = int(numpy.count_nonzero(new != a))
+        a[...] = new
+
+        m.neighbors = self.get_neighbors(m)
+        return changed
+
+# -----------------------------------------------------------------------------
+
+
+class IncrementalEngine(PythonEngine):
+    """
+    Pure python engine that keeps the neighbor counts up to
+    date as cells flip. A cell can only change when it or
+    one of its neighbors changed on the last pass, so each
+    pass only looks at that frontier instead of the whole
+    map.
+    """
+
+    name = 'incremental'
+
+    # -------------------------------------------------------------------------
+
+
+    # constructor
+    def __init__(self):
+        self.reset()
+
+    # -------------------------------------------------------------------------
+
+
+    # forget the tracked state.
+    def reset(self):
+        """
+        Drop the frontier, the next pass recounts every cell.
+        Call this after changing a map's cells by hand.
+        """
+
+        self.grid = None
+        self.counts = None
+        self.frontier = None
+
+    # -------------------------------------------------------------------------
+
+
+    # take in cells that were changed by hand.
+    def note_changes(self, m, indices):
+        """
+        Add the changed cells (flat indices) and their 8
+        neighbors to the frontier, for when the map's cells
+        were set by hand and its neighbor counts were fixed
+        up along with them (see Map.set_cells), so the next
+        pass stays incremental.
+        """
+
+        # not tracking this map, or sweeping all of it anyway.
+        if (m.map is not self.grid) or (m.neighbors is not self.counts):
+            return
+        if self.frontier is None:
+            return
+
+        h, w = m.height, m.width
+        for i in indices:
+            y, x = divmod(i, w)
+            for j in range(max(0, y - 1), min(h, y + 2)):
+                for k in range(max(0, x - 1), min(w, x + 2)):
+                    self.frontier.add(j * w + k)
+
+    # -------------------------------------------------------------------------
+
+
+    # pulls an array of neighbor counts and returns it.
+    def get_neighbors(self, m):
+        """
+        Counts the neighbors of every cell, and starts to
+        track them so the next pass can be incremental. The
+        count is done a row at a time by the bitboard engine,
+        in time linear in the map, as it is done whenever the
+        map is swapped out or its groups are connected.
+        """
+
+        neighbors = BitboardEngine().get_neighbors(m)
+
+        self.grid = m.map
+        self.counts = neighbors
+        self.frontier = None
+
+        return neighbors
+
+    # -------------------------------------------------------------------------
+
+
+    # run one pass of the game of life over the frontier.
+    def game_of_life(self, m):
+        """
+        Work out the new value of every cell on the frontier
+        from the tracked counts, then flip the cells that
+        changed and adjust the counts of their 8 neighbors.
+        The flipped cells and their neighbors become the
+        next frontier. Returns the number of cells flipped.
+        """
+
+        # if the map or counts were swapped out under us,
+        # start over with a full count.
+        if (m.map is not self.grid) or (m.neighbors is not self.counts):
+            m.neighbors = self.get_neighbors(m)
+
+        h, w = m.height, m.width
+        data = m.map.data
+        counts = self.counts.data
+        table = m.rules.table(m.wall_val, m.space_val)
+
+        frontier = self.frontier
+        if frontier is None:
+            frontier = range(0, h * w)
+
+        # find all the changes before making any, so the
+        # pass stays the same as a full sweep.
+        changes = []
+        for i in frontier:
+            v = data[i]
+            new = table[v][counts[i]]
+            if new != v:
+                changes += [(i, new)]
+
+        # flip the cells, and fix up the neighbor counts.
+        frontier = set()
+        for i, new in changes:
+            data[i] = new
+            delta = 1 if new == m.space_val else -1
+            frontier.add(i)
+
+            y, x = divmod(i, w)
+            for j in (y - 1, y, y + 1):
+                if not 0 <= j < h:
+                    continue
+                for k in (x - 1, x, x + 1):
+                    if (0 <= k < w) and ((j != y) or (k != x)):
+                        counts[j * w + k] += delta
+                        frontier.add(j * w + k)
+
+        self.frontier = frontier
+        return len(changes)
+
+# -----------------------------------------------------------------------------
+
+
+class BitboardEngine(object):
+    """
+    Pure python engine that packs each row of the map into
+    one int, bit x set if cell x is a space. The 8 shifted
+    neighbor rows are summed with bitwise adders into four
+    bit planes of the count, so every step works on a whole
+    row at once, and the rules become masks built from the
+    planes.
+    """
+
+    name = 'bitboard'
+
+    # -------------------------------------------------------------------------
+
+
+    # pack the map into one int per row.
+    def to_rows(self, m):
+        """
+        Turn the map into a list of ints, by writing each row
+        out as '0's and '1's and reading it back in base 2,
+        reversed so that cell x lands on bit x.
+        """
+
+        table = bytes(0x31 if b == m.space_val else 0x30
+                      for b in range(0, 256))
+        text = m.map.data.tobytes().translate(table)
+
+        w = m.width
+        return [int(text[y*w:(y+1)*w][::-1], 2) for y in range(0, m.height)]
+
+    # -------------------------------------------------------------------------
+
+
+    # unpack one int per row back into bytes.
+    def from_rows(self, rows, w, zero, one):
+        """
+        Turn a list of row ints back into bytes, one per cell,
+        with the clear bits as zero and the set bits as one.
+        """
+
+        fmt = '0{}b'.format(w)
+        text = b''.join(format(r, fmt)[::-1].encode() for r in rows)
+        return text.translate(bytes.maketrans(b'01', bytes([zero, one])))
+
+    # -------------------------------------------------------------------------
+
+
+    # sum up the space neighbors of a row as bit planes.
+    def planes(self, rows, y, w):
+        """
+        Add the 8 neighbor rows of row y together, one bit
+        per cell, and return the four bit planes [1s, 2s, 4s,
+        8s] of the counts. Cells off the edge of the map add
+        nothing.
+        """
+
+        full = (1 << w) - 1
+        up = rows[y - 1] if y > 0 else 0
+        cur = rows[y]
+        down = rows[y + 1] if y < len(rows) - 1 else 0
+
+        planes = [0, 0, 0, 0]
+        for b in ((up << 1) & full, up, up >> 1,
+                  (cur << 1) & full, cur >> 1,
+                  (down << 1) & full, down, down >> 1):
+
+            # ripple the bit through the planes.
+            for k in range(0, 4):
+                carry = planes[k] & b
+                planes[k] ^= b
+                b = carry
+                if not b:
+                    break
+
+        return planes
+
+    # -------------------------------------------------------------------------
+
+
+    # mask of the cells with a count in a set.
+    def match(self, planes, counts, full):
+        """
+        Return the mask of cells whose count, read from the
+        bit planes, is one of counts.
+        """
+
+        mask = 0
+        for n in counts:
+            eq = full
+            for k in range(0, 4):
+                eq &= planes[k] if n & (1 << k) else ~planes[k]
+            mask |= eq
+
+        return mask & full
+
+    # -------------------------------------------------------------------------
+
+
+    # turn the bit planes of every row into counts.
+    def count(self, rows, w):
+        """
+        Return the neighbor counts of every cell as bytes.
+        Each plane is unpacked to one byte per cell, read as
+        a single int, and the four are added up with their
+        weights, no cell's sum ever carries into the next.
+        """
+
+        out = []
+        for y in range(0, len(rows)):
+            total = 0
+            for k, p in enumerate(self.planes(rows, y, w)):
+                cells = self.from_rows([p], w, 0, 1)
+                total += int.from_bytes(cells, 'little') << k
+            out += [total.to_bytes(w, 'little')]
+
+        return b''.join(out)
+
+    # -------------------------------------------------------------------------
+
+
+    # pulls an array of neighbor counts and returns it.
+    def get_neighbors(self, m):
+        """
+        Returns the neighbor counts as a grid, the same as
+        the python engine hands back.
+        """
+
+        rows = self.to_rows(m)
+        return Grid(m.height, m.width, data=self.count(rows, m.width))
+
+    # -------------------------------------------------------------------------
+
+
+    # run one pass of the game of life over the map.
+    def game_of_life(self, m):
+        """
+        Work out every row's new spaces from the bit planes
+        of its counts and the rule masks, write them back
+        into the map, and recount the neighbors. Returns the
+        number of cells that changed.
+        """
+
+        h, w = m.height, m.width
+        full = (1 << w) - 1
+        rows = self.to_rows(m)
+
+        new = []
+        changed = 0
+        for y in range(0, h):
+            planes = self.planes(rows, y, w)
+            space = rows[y]
+
+            # a cell is a wall next pass if it was a wall and
+            # survives, or was a space and a wall is born.
+            wall = ((~space & self.match(planes, m.rules.survival, full)) |
+                    (space & self.match(planes, m.rules.birth, full)))
+
+            new += [full & ~wall]
+            changed += bin(new[y] ^ space).count('1')
+
+        m.map.data[:] = array('B', self.from_rows(new, w, m.wall_val,
+                                                  m.space_val))
+        m.neighbors = Grid(h, w, data=self.count(new, w))
+
+        return changed
+
+# -----------------------------------------------------------------------------
+
+
+# all the engines a map can be built with, by name.
+ENGINES = {
+    PythonEngine.name: PythonEngine,
+    NumpyEngine.name: NumpyEngine,
+    IncrementalEngine.name: IncrementalEngine,
+    BitboardEngine.name: BitboardEngine,
+}
+
+# -----------------------------------------------------------------------------
+
+
+# look up an engine by name and make one.
+def get_engine(name):
+    """
+    Return a new engine instance for the given name, or
+    raise a ValueError if no engine goes by that name.
+    """
+
+    if name not in ENGINES:
+        raise ValueError('unknown engine {!r}, expected one of {}'.format(
+            name, ', '.join(sorted(ENGINES))))
+
+    return ENGINES[name]()
+
+# -----------------------------------------------------------------------------
@@ -0,0 +1,283 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+# Distance fields (Dijkstra maps) over the open cells of a
+# map. A field holds the number of 4-connected steps from
+# every space to the nearest of a set of sources (the
+# player, the exits, ...), found in one multi-source BFS, so
+# any number of agents can walk down it a step at a time
+# without searching. When the sources move, only the cells
+# that were nearest to a source that went away are redone.
+
+# -----------------------------------------------------------------------------
+
+
+import heapq
+from array import array
+from collections import deque
+
+# -----------------------------------------------------------------------------
+
+
+# the distance of a cell no source can reach.
+UNREACHED = -1
+
+# -----------------------------------------------------------------------------
+
+
+class DistanceField(object):
+    """
+    The distance from every space of a map to its nearest
+    source, kept as a flat array (dist) with UNREACHED for
+    walls and cells cut off from every source, or further
+    than max_distance from them. Each reached cell also
+    remembers which source it is nearest to (owner), which
+    is what lets update() redo only part of the field.
+    """
+
+    # -------------------------------------------------------------------------
+
+
+    # constructor
+    def __init__(self, m, sources=(), max_distance=None):
+        self.m = m
+        self.height = m.height
+        self.width = m.width
+        self.max_distance = max_distance
+
+        self.sources = set()
+        self.dist = array('l', [UNREACHED]) * (m.height * m.width)
+        self.owner = array('l', [UNREACHED]) * (m.height * m.width)
+
+        self.update(sources)
+
+    # -------------------------------------------------------------------------
+
+
+    # turn a source into a flat index into the map.
+    def index(self, source):
+        """
+        Sources can be flat indices, (y, x) pairs or anything
+        with y and x, like a Coordinate. A ValueError is
+        raised for one that is not a space of the map.
+        """
+
+        if isinstance(source, int):
+            i = source
+            ok = 0 <= i < self.height * self.width
+        else:
+            y, x = (source.y, source.x) if hasattr(source, 'y') else source
+            i = y * self.width + x
+            ok = 0 <= y < self.height and 0 <= x < self.width
+
+        if not ok or self.m.map.data[i] != self.m.space_val:
+            raise ValueError('source {} is not a space of the map'.format(
+                source))
+
+        return i
+
+    # -------------------------------------------------------------------------
+
+
+    # the open cells next to a cell.
+    def open_neighbors(self, i):
+        w = self.width
+        cells = self.m.map.data
+        space = self.m.space_val
+        x = i % w
+
+        if x > 0 and cells[i - 1] == space:
+            yield i - 1
+        if x < w - 1 and cells[i + 1] == space:
+            yield i + 1
+        if i >= w and cells[i - w] == space:
+            yield i - w
+        if i + w < len(cells) and cells[i + w] == space:
+            yield i + w
+
+    # -------------------------------------------------------------------------
+
+
+    # work the whole field out again.
+    def rebuild(self):
+        """
+        Forget every distance and run one BFS out from all
+        of the sources at once. Needed after the map's cells
+        change, moving the sources only needs update().
+        """
+
+        n = self.height * self.width
+        self.dist = array('l', [UNREACHED]) * n
+        self.owner = array('l', [UNREACHED]) * n
+
+        dist, owner = self.dist, self.owner
+        cap = self.max_distance
+
+        queue = deque()
+        for s in self.sources:
+            dist[s] = 0
+            owner[s] = s
+            queue.append(s)
+
+        while queue:
+            i = queue.popleft()
+            d = dist[i] + 1
+            if cap is not None and d > cap:
+                continue
+            for j in self.open_neighbors(i):
+                if dist[j] == UNREACHED:
+                    dist[j] = d
+                    owner[j] = owner[i]
+                    queue.append(j)
+
+    # -------------------------------------------------------------------------
+
+
+    # move the sources, redoing as little as we can.
+    def update(self, sources):
+        """
+        Make sources the new set of sources. The cells whose
+        nearest source was taken away are cleared, then a
+        Dijkstra pass out from the new sources and the edge
+        of the cleared cells fills them back in and lowers
+        any cell a new source is nearer to. Returns how many
+        cells were cleared or changed.
+
+        Moving one source changes every distance to it, so a
+        single moving player still redoes its whole field,
+        max_distance is what keeps that cheap.
+        """
+
+        sources = set(self.index(s) for s in sources)
+        removed = self.sources - sources
+        added = sources - self.sources
+        self.sources = sources
+
+        if not removed and not added:
+            return 0
+
+        dist, owner = self.dist, self.owner
+        cap = self.max_distance
+
+        # clear every cell owned by a removed source, those
+        # cells are all joined to it through each other.
+        cleared = []
+        for s in removed:
+            dist[s] = UNREACHED
+            owner[s] = UNREACHED
+            queue = deque([s])
+            cleared += [s]
+            while queue:
+                i = queue.popleft()
+                for j in self.open_neighbors(i):
+                    if owner[j] == s:
+                        dist[j] = UNREACHED
+                        owner[j] = UNREACHED
+                        queue.append(j)
+                        cleared += [j]
+
+        # the cells still reached around the cleared ones,
+        # and the new sources, are where the pass starts.
+        heap = []
+        for i in cleared:
+            for j in self.open_neighbors(i):
+                if dist[j] != UNREACHED:
+                    heap += [(dist[j], j)]
+        for s in added:
+            dist[s] = 0
+            owner[s] = s
+            heap += [(0, s)]
+        heapq.heapify(heap)
+
+        changed = len(cleared)
+
+        while heap:
+            d, i = heapq.heappop(heap)
+            if d != dist[i]:
+                continue
+            d += 1
+            if cap is not None and d > cap:
+                continue
+            for j in self.open_neighbors(i):
+                if dist[j] == UNREACHED or d < dist[j]:
+                    dist[j] = d
+                    owner[j] = owner[i]
+                    heapq.heappush(heap, (d, j))
+                    changed += 1
+
+        return changed
+
+    # -------------------------------------------------------------------------
+
+
+    # swap one source for another, like a player moving.
+    def move(self, old, new):
+        return self.update((self.sources - {self.index(old)}) |
+                           {self.index(new)})
+
+    # -------------------------------------------------------------------------
+
+
+    # the distance from y, x to its nearest source.
+    def distance(self, y, x):
+        d = self.dist[y * self.width + x]
+        return None if d == UNREACHED else d
+
+    # -------------------------------------------------------------------------
+
+
+    # one step down (or up) the field from y, x.
+    def step(self, y, x, away=False):
+        """
+        Return the (y, x) of the open neighbor that is
+        nearest to a source, or furthest if away is set, or
+        None if no neighbor is better than where we stand
+        (at a source, or cut off from every source).
+        """
+
+        dist = self.dist
+        i = y * self.width + x
+        best, here = None, dist[i]
+
+        if here == UNREACHED:
+            return None
+
+        for j in self.open_neighbors(i):
+            d = dist[j]
+            if d == UNREACHED:
+                continue
+            if (d > here) if away else (d < here):
+                best, here = j, d
+
+        return None if best is None else divmod(best, self.width)
+
+    # -------------------------------------------------------------------------
+
+
+    # the whole way from y, x to its nearest source.
+    def path(self, y, x):
+        """
+        Return the list of (y, x) steps from y, x down to its
+        nearest source, empty if y, x is a source or cannot
+        reach one.
+        """
+
+        steps = []
+        here = self.step(y, x)
+        while here is not None:
+            steps += [here]
+            here = self.step(*here)
+
+        return steps
+
+# -----------------------------------------------------------------------------
@@ -0,0 +1,328 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+
+import os
+import sys
+import mmap
+import struct
+from array import array
+
+import NecroEngine
+from NecroGrid import Grid, label_typecode
+
+# -----------------------------------------------------------------------------
+
+# A map file is a fixed size header followed by two planes,
+# the cells (one byte each) and then the group labels (one
+# item of label_type each), both in row major order. All of
+# it is little-endian, whatever machine wrote it.
+#
+#   magic           4s  b'NECM'
+#   version         H
+#   header size     H
+#   height, width   I I
+#   seed            Q
+#   birth, survival H H   bit n set if n is in the rule set
+#   iterations run  I
+#   label type      c   'B', 'H' or 'I', 1, 2 or 4 bytes
+#   byte order      c   b'<'
+#   padding         2x
+#   group count     I
+
+MAGIC = b'NECM'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIQHHIcc2xI')
+
+# the label types a file can hold, and their sizes.
+LABEL_SIZES = {'B': 1, 'H': 2, 'I': 4}
+
+# -----------------------------------------------------------------------------
+
+
+# pack the header of a map file.
+def pack_header(h, w, seed, rules, iterations_run, label_type, num_groups):
+    return HEADER.pack(MAGIC, VERSION, HEADER.size, h, w, seed,
+                       to_mask(rules.birth), to_mask(rules.survival),
+                       iterations_run, label_type.encode(), b'<',
+                       num_groups)
+
+# -----------------------------------------------------------------------------
+
+
+# turn an array of labels into the bytes a file holds.
+def label_bytes(labels, label_type):
+    """
+    Return the labels as little-endian items of label_type,
+    converting and swapping them only if need be.
+    """
+
+    if labels.typecode != label_type or sys.byteorder == 'big':
+        labels = array(label_type, labels)
+    if sys.byteorder == 'big':
+        labels.byteswap()
+
+    return memoryview(labels)
+
+# -----------------------------------------------------------------------------
+
+
+# turn a set of neighbor counts into a bit mask.
+def to_mask(counts):
+    return sum(1 << n for n in counts)
+
+# turn a bit mask back into a list of neighbor counts.
+def from_mask(mask):
+    return [n for n in range(0, 9) if mask & (1 << n)]
+
+# -----------------------------------------------------------------------------
+
+
+# write a map out in the binary format.
+def write_map(m, path):
+    """
+    Write the header, cells and group labels of the map (m)
+    to the file at path, straight from the grids' memory on
+    little-endian machines.
+    """
+
+    if not 0 <= m.seed < (1 << 64):
+        raise ValueError('only seeds from 0 to 2**64 can be saved')
+
+    label_type = label_typecode(len(m.groups))
+    header = pack_header(m.height, m.width, m.seed, m.rules,
+                         m.iterations_run, label_type, len(m.groups))
+
+    with open(path, 'wb') as f:
+        f.write(header)
+        f.write(memoryview(m.map.data))
+        f.write(label_bytes(m.group_map.data, label_type))
+
+# -----------------------------------------------------------------------------
+
+
+class MapFile(object):
+    """
+    A map file opened with mmap. Only the header is read up
+    front, rows and windows of the cell and label planes are
+    read from the mapping as they are asked for. The views
+    handed out by row() and label_row() keep the mapping
+    alive, let go of them before calling close().
+    """
+
+    # -------------------------------------------------------------------------
+
+
+    # constructor
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            fields = HEADER.unpack_from(self.mm, 0)
+        except struct.error:
+            self.mm.close()
+            raise ValueError('{} is too short to be a map file'.format(path))
+
+        (magic, version, header_size, self.height, self.width, self.seed,
+         birth, survival, self.iterations_run, label_type, order,
+         self.num_groups) = fields
+
+        if magic != MAGIC or version > VERSION:
+            self.mm.close()
+            raise ValueError('{} is not a version {} map file'.format(
+                path, VERSION))
+
+        self.rules = NecroEngine.Rules(from_mask(birth), from_mask(survival))
+        self.label_type = label_type.decode()
+        self.label_size = LABEL_SIZES.get(self.label_type)
+
+        if (order != b'<' or self.label_size is None or
+                array(self.label_type).itemsize != self.label_size):
+            self.mm.close()
+            raise ValueError('{} has labels this machine cannot read'.format(
+                path))
+
+        # labels only have to be swapped on big-endian machines.
+        self.swap = sys.byteorder == 'big'
+
+        # where each plane starts.
+        self.cells_at = header_size
+        self.labels_at = header_size + self.height * self.width
+
+        end = self.labels_at + self.height * self.width * self.label_size
+        if len(self.mm) < end:
+            self.mm.close()
+            raise ValueError('{} is cut short'.format(path))
+
+        self.view = memoryview(self.mm)
+
+    # -------------------------------------------------------------------------
+
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    # -------------------------------------------------------------------------
+
+
+    # let go of the mapping.
+    def close(self):
+        self.view.release()
+        self.mm.close()
+
+    # -------------------------------------------------------------------------
+
+
+    # one row of cells.
+    def row(self, y):
+        """
+        Return a read only view of row y of the cell plane.
+        """
+
+        assert 0 <= y < self.height, 'row out of bounds'
+
+        start = self.cells_at + y * self.width
+        return self.view[start:start+self.width]
+
+    # -------------------------------------------------------------------------
+
+
+    # one row of group labels.
+    def label_row(self, y):
+        """
+        Return a read only view of row y of the label plane,
+        as ints of the label type. On big-endian machines the
+        row is copied out into a swapped array instead.
+        """
+
+        assert 0 <= y < self.height, 'row out of bounds'
+
+        size = self.width * self.label_size
+        start = self.labels_at + y * size
+        row = self.view[start:start+size].cast(self.label_type)
+
+        if self.swap:
+            row = array(self.label_type, row)
+            row.byteswap()
+
+        return row
+
+    # -------------------------------------------------------------------------
+
+
+    # copy a window of the map out into a grid.
+    def window(self, y0, x0, y1, x1, labels=False):
+        """
+        Return a Grid of the cells (or labels) from y0, x0 up
+        to, but not including, y1, x1. Only those rows are
+        read from the file.
+        """
+
+        assert 0 <= y0 <= y1 <= self.height, 'rows out of bounds'
+        assert 0 <= x0 <= x1 <= self.width, 'columns out of bounds'
+
+        typecode = self.label_type if labels else 'B'
+        get_row = self.label_row if labels else self.row
+
+        data = array(typecode)
+        for y in range(y0, y1):
+            data.extend(get_row(y)[x0:x1])
+
+        return Grid(y1 - y0, x1 - x0, typecode, data=data)
+
+    # -------------------------------------------------------------------------
+
+
+    # copy the whole cell plane out into a grid.
+    def cells(self):
+        return self.window(0, 0, self.height, self.width)
+
+    # copy the whole label plane out into a grid.
+    def labels(self):
+        return self.window(0, 0, self.height, self.width, labels=True)
+
+# -----------------------------------------------------------------------------
+
+
+# A cells file holds the cells and neighbor counts of a map
+# (one byte each, row major) for the caches that keep maps
+# on disk. The key the map was saved under is written out
+# as text after the header, so a file saved for some other
+# settings is never read back as this one.
+#
+#   magic           4s  b'NECC'
+#   version         H
+#   key length      H
+#   height, width   I I
+#   iterations run  I
+
+CELLS_MAGIC = b'NECC'
+CELLS_VERSION = 1
+CELLS_HEADER = struct.Struct('<4sHHIII')
+
+# -----------------------------------------------------------------------------
+
+
+# save the cells and counts of a map under a key.
+def write_cells(path, key, h, w, cells, neighbors, iterations_run):
+    """
+    Write the cells and neighbor counts (bytes of h * w) to
+    the file at path under key, any value with a lasting
+    repr. The file is written to a temp file first, so a
+    half written one is never read back.
+    """
+
+    text = repr(key).encode()
+    header = CELLS_HEADER.pack(CELLS_MAGIC, CELLS_VERSION, len(text), h, w,
+                               iterations_run)
+
+    with open(path + '.tmp', 'wb') as f:
+        f.write(header)
+        f.write(text)
+        f.write(cells)
+        f.write(neighbors)
+    os.replace(path + '.tmp', path)
+
+# -----------------------------------------------------------------------------
+
+
+# read the cells and counts of a map back.
+def read_cells(path, key):
+    """
+    Return (cells, neighbors, iterations_run) saved at path,
+    the first two as bytes, or None if there is no file,
+    it was saved under another key, or it is not a whole
+    cells file.
+    """
+
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, size, h, w, iterations_run = \
+            CELLS_HEADER.unpack_from(data, 0)
+    except (OSError, struct.error):
+        return None
+
+    start = CELLS_HEADER.size + size
+    if (magic != CELLS_MAGIC or version != CELLS_VERSION or
+            data[CELLS_HEADER.size:start] != repr(key).encode() or
+            len(data) != start + 2 * h * w):
+        return None
+
+    return (data[start:start + h * w], data[start + h * w:], iterations_run)
+
+# -----------------------------------------------------------------------------
@@ -0,0 +1,233 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+# Field of view. What can be seen from a cell is found with
+# recursive shadowcasting over the 8 octants around it, the
+# walls blocking sight but being seen themselves. Results
+# are kept in an LRU cache keyed on (origin, radius), along
+# with the map version they were made at, and are reused
+# after the map changes as long as none of the changed
+# cells are within the radius.
+
+# -----------------------------------------------------------------------------
+
+
+from collections import OrderedDict
+
+# -----------------------------------------------------------------------------
+
+
+# how each octant turns (row, col) steps into (y, x) steps,
+# as (xx, xy, yx, yy).
+OCTANTS = [
+    (1, 0, 0, 1), (0, 1, 1, 0), (0, -1, 1, 0), (-1, 0, 0, 1),
+    (-1, 0, 0, -1), (0, -1, -1, 0), (0, 1, -1, 0), (1, 0, 0, -1),
+]
+
+# -----------------------------------------------------------------------------
+
+
+# find every cell visible from y, x.
+def field_of_view(m, y, x, radius):
+    """
+    Return a frozenset of the flat indices of the cells of
+    the map seen from y, x, within radius (a circle). The
+    origin is always seen, walls are seen but block the view
+    past them.
+    """
+
+    h, w = m.height, m.width
+    cells = m.map.data
+    space = m.space_val
+    r2 = radius * radius
+
+    seen = {y * w + x}
+
+    # light one octant, from row on, between two slopes.
+    def cast(row, start, end, xx, xy, yx, yy):
+        if start < end:
+            return
+
+        for j in range(row, radius + 1):
+            dx, dy = -j - 1, -j
+            blocked = False
+            new_start = start
+
+            while dx <= 0:
+                dx += 1
+                cx = x + dx * xx + dy * xy
+                cy = y + dx * yx + dy * yy
+                left = (dx - 0.5) / (dy + 0.5)
+                right = (dx + 0.5) / (dy - 0.5)
+
+                if start < right:
+                    continue
+                if end > left:
+                    break
+
+                inside = 0 <= cy < h and 0 <= cx < w
+                i = cy * w + cx
+
+                if inside and dx * dx + dy * dy <= r2:
+                    seen.add(i)
+
+                wall = not inside or cells[i] != space
+
+                if blocked:
+                    if wall:
+                        new_start = right
+                    else:
+                        blocked = False
+                        start = new_start
+                elif wall and j < radius:
+                    blocked = True
+                    cast(j + 1, start, left, xx, xy, yx, yy)
+                    new_start = right
+
+            if blocked:
+                break
+
+    for xx, xy, yx, yy in OCTANTS:
+        cast(1, 1.0, 0.0, xx, xy, yx, yy)
+
+    return frozenset(seen)
+
+# -----------------------------------------------------------------------------
+
+
+class FovCache(object):
+    """
+    Caches the field of view of a map per (origin, radius),
+    keeping up to maxsize of the recently used ones. Each
+    entry remembers the map version it was made at, when
+    the map has moved on since, the cells changed in the
+    meantime (Map.changes_since) are checked, and the entry
+    is only made again if one of them is within the radius
+    of the origin.
+    """
+
+    # -------------------------------------------------------------------------
+
+
+    # constructor
+    def __init__(self, m, maxsize=1024):
+        self.m = m
+        self.maxsize = maxsize
+        self.memory = OrderedDict()
+
+        # counters for how each lookup was served.
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    # -------------------------------------------------------------------------
+
+
+    # check if an entry made at a version is still good.
+    def still_valid(self, y, x, radius, version, changes):
+        """
+        An entry is still good if none of the cells changed
+        since it was made are within the square of radius
+        around the origin. changes caches the changed cells
+        per version, so a batch only asks the map once.
+        """
+
+        if version not in changes:
+            changes[version] = self.m.changes_since(version)
+
+        changed = changes[version]
+        if changed is None:
+            return False
+
+        w = self.m.width
+        for i in changed:
+            cy, cx = divmod(i, w)
+            if abs(cy - y) <= radius and abs(cx - x) <= radius:
+                return False
+
+        return True
+
+    # -------------------------------------------------------------------------
+
+
+    # the cells seen from y, x.
+    def visible(self, y, x, radius, changes=None):
+        """
+        Return the frozenset of flat indices seen from y, x
+        within radius, from the cache when it can be.
+        """
+
+        changes = {} if changes is None else changes
+        key = (y, x, radius)
+        version = self.m.version
+
+        entry = self.memory.get(key)
+        if entry is not None:
+            made, seen = entry
+            self.memory.move_to_end(key)
+
+            if made == version:
+                self.hits += 1
+                return seen
+
+            if self.still_valid(y, x, radius, made, changes):
+                self.revalidated += 1
+                self.memory[key] = (version, seen)
+                return seen
+
+        self.misses += 1
+        seen = field_of_view(self.m, y, x, radius)
+
+        self.memory[key] = (version, seen)
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
+
+        return seen
+
+    # -------------------------------------------------------------------------
+
+
+    # the cells seen from many origins at once.
+    def visible_many(self, origins, radius):
+        """
+        Return a list with the frozenset seen from each
+        (y, x) of origins, say every monster on a turn. An
+        origin given twice is only looked up once, and the
+        map's change log is read once per version.
+        """
+
+        changes = {}
+        done = {}
+
+        for y, x in origins:
+            if (y, x) not in done:
+                done[(y, x)] = self.visible(y, x, radius, changes)
+
+        return [done[(y, x)] for y, x in origins]
+
+    # -------------------------------------------------------------------------
+
+
+    # can one cell be seen from another.
+    def sees(self, y, x, ty, tx, radius):
+        return ty * self.m.width + tx in self.visible(y, x, radius)
+
+    # -------------------------------------------------------------------------
+
+
+    # forget every cached view.
+    def clear(self):
+        self.memory.clear()
+
+# -----------------------------------------------------------------------------
@@ -0,0 +1,179 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+
+from array import array
+
+# -----------------------------------------------------------------------------
+
+
+# pick the smallest array typecode that can hold n labels
+# plus the 0 used for walls.
+def label_typecode(n):
+    """
+    Return 'B', 'H' or 'I' depending on how many distinct
+    labels (n) have to fit into a grid cell. 'I' is 4 bytes
+    on every platform we run on, where 'L' can be 8.
+    """
+
+    if n <= 0xff:
+        return 'B'
+    elif n <= 0xffff:
+        return 'H'
+
+    return 'I'
+
+# -----------------------------------------------------------------------------
+
+
+class Grid(object):
+    """
+    A height by width grid of small ints kept in one flat
+    array. Indexing a grid with y gives back a writable
+    view of that row, so grid[y][x] works the same as it
+    does on a list of lists.
+    """
+
+    __slots__ = ('height', 'width', 'data', 'rows')
+
+    # -------------------------------------------------------------------------
+
+
+    # constructor
+    def __init__(self, h, w, typecode='B', fill=0, data=None):
+        """
+        Make a grid h rows tall and w cells wide, either
+        filled with a single value or wrapped around an
+        existing flat array (data) of h * w items.
+        """
+
+        if data is None:
+            data = array(typecode, [fill]) * (h * w)
+        elif not isinstance(data, array):
+            data = array(typecode, data)
+
+        assert len(data) == h * w, 'grid data does not match its size'
+
+        self.height = h
+        self.width = w
+        self.data = data
+
+        # one view per row, handed out by __getitem__.
+        view = memoryview(data)
+        self.rows = [view[y*w:(y+1)*w] for y in range(0, h)]
+
+    # -------------------------------------------------------------------------
+
+
+    # build a grid out of a list of lists.
+    @classmethod
+    def from_rows(cls, rows, typecode='B'):
+        """
+        Copy a list of equal length rows into a new grid.
+        """
+
+        h = len(rows)
+        w = len(rows[0]) if h else 0
+
+        data = array(typecode)
+        for row in rows:
+            assert len(row) == w, 'rows are not all the same length'
+            data.extend(row)
+
+        return cls(h, w, typecode, data=data)
+
+    # -------------------------------------------------------------------------
+
+
+    def __getitem__(self, y):
+        return self.rows[y]
+
+    def __len__(self):
+        return self.height
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __eq__(self, o):
+        if isinstance(o, Grid):
+            return ((self.height, self.width) == (o.height, o.width) and
+                    self.data == o.data)
+        return self.tolist() == o
+
+    def __reduce__(self):
+        return (Grid, (self.height, self.width, self.typecode, 0,
+                       self.data))
+
+    # -------------------------------------------------------------------------
+
+
+    @property
+    def typecode(self):
+        return self.data.typecode
+
+    # -------------------------------------------------------------------------
+
+
+    # count the cells holding a value.
+    def count(self, v):
+        """
+        Return the amount of cells in the grid equal to v.
+        """
+
+        return self.data.count(v)
+
+    # -------------------------------------------------------------------------
+
+
+    # set a run of cells in a row to one value.
+    def fill(self, y, x0, x1, v):
+        """
+        Set the cells from x0 up to (not including) x1 on
+        row y to v, in one slice assignment.
+        """
+
+        start = y * self.width
+        self.data[start+x0:start+x1] = array(self.typecode, [v]) * (x1 - x0)
+
+    # -------------------------------------------------------------------------
+
+
+    # copy the grid.
+    def copy(self):
+        """
+        Return a new grid with its own copy of the data.
+        """
+
+        return Grid(self.height, self.width, self.typecode,
+                    data=array(self.typecode, self.data))
+
+    # -------------------------------------------------------------------------
+
+
+    # give back the raw bytes of the grid.
+    def tobytes(self):
+        return self.data.tobytes()
+
+    # -------------------------------------------------------------------------
+
+
+    # give back the grid as a list of lists.
+    def tolist(self):
+        """
+        Return the contents of the grid as a list of lists
+        of ints.
+        """
+
+        return [row.tolist() for row in self.rows]
+
+# -----------------------------------------------------------------------------
@@ -0,0 +1,556 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+
+import re
+from array import array
+from collections import deque
+
+# -----------------------------------------------------------------------------
+
+
+class Group(object):
+    """
+    One contiguous group of cells, stored as the horizontal
+    runs (y, x0, x1) that make it up, x1 being one past the
+    last cell of the run.
+    """
+
+    __slots__ = ('label', 'runs', 'size', 'bbox', 'coord')
+
+    # -------------------------------------------------------------------------
+
+
+    # constructor
+    def __init__(self, label, coord=None):
+        """
+        Make an empty group, coord is called as coord(y, x)
+        to build the items handed out when iterating, and
+        defaults to (y, x) tuples.
+        """
+
+        self.label = label
+        self.runs = []
+        self.size = 0
+        # (top, left, bottom, right), all inclusive.
+        self.bbox = None
+        self.coord = coord
+
+    # -------------------------------------------------------------------------
+
+
+    # add a run of cells onto the group.
+    def add_run(self, y, x0, x1):
+        """
+        Add the cells from x0 up to x1 on row y, growing the
+        size and bounding box to fit them.
+        """
+
+        self.runs += [(y, x0, x1)]
+        self.size += x1 - x0
+
+        if self.bbox is None:
+            self.bbox = (y, x0, y, x1 - 1)
+        else:
+            top, left, bottom, right = self.bbox
+            self.bbox = (min(top, y), min(left, x0), max(bottom, y),
+                         max(right, x1 - 1))
+
+    # -------------------------------------------------------------------------
+
+
+    # take one cell out of the group.
+    def remove_cell(self, y, x):
+        """
+        Split the run holding y, x around it, and shrink the
+        bounding box if the cell was on its edge.
+        """
+
+        for k, (ry, x0, x1) in enumerate(self.runs):
+            if ry == y and x0 <= x < x1:
+                break
+        else:
+            raise ValueError('({}, {}) is not in {}'.format(y, x, self))
+
+        self.runs[k:k+1] = [r for r in ((y, x0, x), (y, x + 1, x1))
+                            if r[1] < r[2]]
+        self.size -= 1
+
+        top, left, bottom, right = self.bbox
+        if y in (top, bottom) or x in (left, right):
+            self.fit_bbox()
+
+    # -------------------------------------------------------------------------
+
+
+    # take many cells out of the group at once.
+    def remove_cells(self, indices, width):
+        """
+        Take the cells at the flat indices out of the runs
+        they are in, for a map of the given width.
+        """
+
+        rows = {}
+        for i in indices:
+            y, x = divmod(i, width)
+            rows.setdefault(y, set()).add(x)
+
+        # only the runs on rows that lost cells are split.
+        runs = [r for r in self.runs if r[0] not in rows]
+        for y, x0, x1 in [r for r in self.runs if r[0] in rows]:
+            gone = rows[y]
+            start = x0
+            for x in range(x0, x1):
+                if x in gone:
+                    if start < x:
+                        runs += [(y, start, x)]
+                    start = x + 1
+            if start < x1:
+                runs += [(y, start, x1)]
+
+        self.runs = runs
+        self.size -= len(indices)
+
+        top, left, bottom, right = self.bbox
+        if (top in rows or bottom in rows or
+                any(left in xs or right in xs for xs in rows.values())):
+            self.fit_bbox()
+
+    # -------------------------------------------------------------------------
+
+
+    # fold another group's runs into this one.
+    def merge(self, other):
+        for y, x0, x1 in other.runs:
+            self.add_run(y, x0, x1)
+
+    # -------------------------------------------------------------------------
+
+
+    # work the bounding box out again from the runs.
+    def fit_bbox(self):
+        if not self.runs:
+            self.bbox = None
+            return
+
+        self.bbox = (min(r[0] for r in self.runs),
+                     min(r[1] for r in self.runs),
+                     max(r[0] for r in self.runs),
+                     max(r[2] for r in self.runs) - 1)
+
+    # -------------------------------------------------------------------------
+
+
+    # list out all of the cells in the group.
+    def cells(self):
+        """
+        Return a list of (y, x) tuples for every cell in the
+        group, in row major order.
+        """
+
+        return [(y, x) for y, x0, x1 in self.runs for x in range(x0, x1)]
+
+    # -------------------------------------------------------------------------
+
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        coord = self.coord
+        for y, x0, x1 in self.runs:
+            for x in range(x0, x1):
+                yield (y, x) if coord is None else coord(y, x)
+
+    def __str__(self):
+        return '[group {}: {} cells in {}]'.format(
+            self.label, self.size, self.bbox)
+
+# -----------------------------------------------------------------------------
+
+
+# find every 4-connected group of a value inside a grid.
+def label_groups(grid, value, coord=None):
+    """
+    Split every row of the grid into runs of the value, then
+    union each run with the runs it touches in the row above.
+    Every run is visited once, and each row is scanned by
+    a regex, so this is linear in the size of the grid.
+    Returns a list of Groups, ordered by the first cell of
+    each group in row major order.
+    """
+
+    assert grid.typecode == 'B', 'label_groups needs a byte grid'
+
+    h, w = grid.height, grid.width
+    buf = grid.data.tobytes()
+    pattern = re.compile(re.escape(bytes([value])) + b'+')
+
+    # parent of every run, and the runs themselves.
+    parent = []
+    runs = []
+
+    # find the root of a run, halving the path as we go.
+    def find(r):
+        while parent[r] != r:
+            parent[r] = parent[parent[r]]
+            r = parent[r]
+        return r
+
+    prev = []
+    for y in range(0, h):
+
+        start = y * w
+        cur = []
+        k = 0
+
+        for match in pattern.finditer(buf, start, start + w):
+            x0 = match.start() - start
+            x1 = match.end() - start
+
+            rid = len(runs)
+            parent += [rid]
+            runs += [(y, x0, x1)]
+
+            # skip the runs above that end before this one.
+            while k < len(prev) and prev[k][1] <= x0:
+                k += 1
+
+            # union with every run above that overlaps, the
+            # lowest id always wins so roots stay in order.
+            j = k
+            while j < len(prev) and prev[j][0] < x1:
+                a, b = find(rid), find(prev[j][2])
+                if a < b:
+                    parent[b] = a
+                elif b < a:
+                    parent[a] = b
+                j += 1
+
+            cur += [(x0, x1, rid)]
+
+        prev = cur
+
+    # hand out the groups, a root is always the first run
+    # of its group, so the groups come out in order.
+    groups = []
+    by_root = {}
+    for rid, (y, x0, x1) in enumerate(runs):
+        root = find(rid)
+        group = by_root.get(root)
+
+        if group is None:
+            group = Group(len(groups), coord)
+            by_root[root] = group
+            groups += [group]
+
+        group.add_run(y, x0, x1)
+
+    return groups
+
+# -----------------------------------------------------------------------------
+
+
+# find the cheapest tunnels that join all groups together.
+def find_tunnels(grid, groups):
+    """
+    Grow every group out into the walls at once, with one
+    breadth first search seeded from all group cells. Where
+    two groups' areas meet, the walls between them are the
+    cheapest tunnel found for that pair. A minimum spanning
+    tree over those tunnels picks which ones to dig, and the
+    flat index of every wall cell on them is returned.
+    """
+
+    h, w = grid.height, grid.width
+
+    # the group that reached a cell first, the cell it was
+    # reached from, and how many walls deep it is.
+    owner = array('l', [-1]) * (h * w)
+    parent = array('l', [-1]) * (h * w)
+    depth = array('l', [0]) * (h * w)
+
+    # every group cell starts off in the queue.
+    queue = array('l')
+    for g_num, group in enumerate(groups):
+        for y, x0, x1 in group.runs:
+            owner[y*w+x0:y*w+x1] = array('l', [g_num]) * (x1 - x0)
+            queue.extend(range(y * w + x0, y * w + x1))
+
+    # the best (cost, cell, cell) seen for each pair.
+    best = {}
+
+    head = 0
+    while head < len(queue):
+        i = queue[head]
+        head += 1
+
+        a = owner[i]
+        y, x = divmod(i, w)
+
+        for j, ok in ((i - w, y > 0), (i + w, y < h - 1),
+                      (i - 1, x > 0), (i + 1, x < w - 1)):
+            if not ok:
+                continue
+
+            b = owner[j]
+            if b == -1:
+                owner[j] = a
+                parent[j] = i
+                depth[j] = depth[i] + 1
+                queue.append(j)
+
+            elif b != a:
+                key = (a, b) if a < b else (b, a)
+                cost = depth[i] + depth[j]
+                if key not in best or cost < best[key][0]:
+                    best[key] = (cost, i, j)
+
+    # kruskal, cheapest tunnels first.
+    root = list(range(0, len(groups)))
+
+    def find(r):
+        while root[r] != r:
+            root[r] = root[root[r]]
+            r = root[r]
+        return r
+
+    carve = []
+    for (a, b), (cost, i, j) in sorted(best.items(), key=lambda e: e[1]):
+        a, b = find(a), find(b)
+        if a == b:
+            continue
+        root[max(a, b)] = min(a, b)
+
+        # walk both ends back to their groups, keeping the
+        # walls passed on the way.
+        for k in (i, j):
+            while depth[k] > 0:
+                carve += [k]
+                k = parent[k]
+
+    return carve
+
+# -----------------------------------------------------------------------------
+
+
+# make a group out of a set of flat indices.
+def group_from_indices(label, indices, width, coord=None):
+    """
+    Return a Group holding the cells at the flat indices,
+    joined up into runs.
+    """
+
+    group = Group(label, coord)
+
+    run = None
+    for i in sorted(indices):
+        y, x = divmod(i, width)
+        if run is not None and run[0] == y and run[2] == x:
+            run[2] += 1
+        else:
+            if run is not None:
+                group.add_run(*run)
+            run = [y, x, x + 1]
+    if run is not None:
+        group.add_run(*run)
+
+    return group
+
+# -----------------------------------------------------------------------------
+
+
+# the labelled cells next to a cell.
+def label_neighbors(labels, y, x):
+    """
+    Return a list of (flat index, label) for the 4 cells
+    around y, x in a grid of labels, 0 being a wall.
+    """
+
+    h, w = labels.height, labels.width
+    data = labels.data
+    i = y * w + x
+
+    out = []
+    for j, ok in ((i - w, y > 0), (i + w, y < h - 1),
+                  (i - 1, x > 0), (i + 1, x < w - 1)):
+        if ok and data[j]:
+            out += [(j, data[j])]
+
+    return out
+
+# -----------------------------------------------------------------------------
+
+
+# find the pieces a group was cut into.
+def cut_pieces(labels, ends, label):
+    """
+    Search out from each of the ends (cells of one label
+    that used to be joined) at once, a cell at a time each.
+    Searches that meet are merged, and a search that runs
+    out of cells has found a piece cut off from the rest.
+    Stops once one search is left, so the work is about the
+    size of the smaller pieces, not the whole group. Returns
+    a list of the cut off pieces as lists of flat indices,
+    empty if the group is still whole.
+    """
+
+    h, w = labels.height, labels.width
+    data = labels.data
+
+    root = list(range(0, len(ends)))
+    owner = {e: s for s, e in enumerate(ends)}
+    frontiers = [deque([e]) for e in ends]
+    members = [[e] for e in ends]
+    live = set(range(0, len(ends)))
+
+    def find(s):
+        while root[s] != s:
+            root[s] = root[root[s]]
+            s = root[s]
+        return s
+
+    pieces = []
+    while len(live) > 1:
+        for s in sorted(live):
+            if len(live) <= 1:
+                break
+            if s not in live:
+                continue
+
+            if not frontiers[s]:
+                live.discard(s)
+                pieces += [members[s]]
+                continue
+
+            i = frontiers[s].popleft()
+            y, x = divmod(i, w)
+            for j, ok in ((i - w, y > 0), (i + w, y < h - 1),
+                          (i - 1, x > 0), (i + 1, x < w - 1)):
+                if not ok or data[j] != label:
+                    continue
+
+                t = owner.get(j)
+                if t is None:
+                    owner[j] = s
+                    frontiers[s].append(j)
+                    members[s].append(j)
+                    continue
+
+                # two searches met, they are one piece.
+                t = find(t)
+                if t != s:
+                    root[t] = s
+                    frontiers[s].extend(frontiers[t])
+                    members[s].extend(members[t])
+                    live.discard(t)
+
+    return pieces
+
+# -----------------------------------------------------------------------------
+
+
+# relabel a group's cells in a grid of labels.
+def paint(labels, group, label):
+    for y, x0, x1 in group.runs:
+        labels.fill(y, x0, x1, label)
+
+# -----------------------------------------------------------------------------
+
+
+# take a group out of the list, keeping the labels packed.
+def drop_group(labels, groups, g_num):
+    """
+    Remove groups[g_num], moving the last group into its
+    place (and relabelling that group's cells) so the labels
+    still run from 1 to len(groups).
+    """
+
+    last = groups.pop()
+    if last.label != g_num:
+        last.label = g_num
+        groups[g_num] = last
+        paint(labels, last, g_num + 1)
+
+# -----------------------------------------------------------------------------
+
+
+# a wall at y, x was opened, add it to the groups.
+def open_cell(labels, groups, y, x, coord=None):
+    """
+    Give the new space at y, x the label of the group next
+    to it. If it touches no group it starts a new one, and
+    if it touches several they are all merged into the
+    biggest, relabelling only the smaller ones. The labels
+    grid must already be wide enough for one more group.
+    """
+
+    touching = sorted(set(l for _, l in label_neighbors(labels, y, x)))
+
+    if not touching:
+        group = Group(len(groups), coord)
+        group.add_run(y, x, x + 1)
+        groups += [group]
+        labels[y][x] = len(groups)
+        return
+
+    keep = max(touching, key=lambda l: groups[l - 1].size)
+    group = groups[keep - 1]
+    group.add_run(y, x, x + 1)
+    labels[y][x] = keep
+
+    # fold the others in, then drop them from the top label
+    # down so moving the last group never moves one of them.
+    others = [l for l in touching if l != keep]
+    for l in others:
+        group.merge(groups[l - 1])
+        paint(labels, groups[l - 1], group.label + 1)
+    for l in reversed(others):
+        drop_group(labels, groups, l - 1)
+
+# -----------------------------------------------------------------------------
+
+
+# a space at y, x was filled in, take it out of the groups.
+def close_cell(labels, groups, y, x, coord=None):
+    """
+    Take the cell at y, x out of its group. If that could
+    have cut the group in two (the cell had more than one
+    neighbor in it), cut_pieces searches out from those
+    neighbors, and every piece cut off from the rest becomes
+    a group of its own.
+    """
+
+    label = labels[y][x]
+    g_num = label - 1
+    labels[y][x] = 0
+
+    group = groups[g_num]
+    group.remove_cell(y, x)
+
+    ends = [j for j, l in label_neighbors(labels, y, x) if l == label]
+
+    if not ends:
+        drop_group(labels, groups, g_num)
+        return
+    if len(ends) == 1:
+        return
+
+    # the pieces cut off become groups of their own, the
+    # rest keeps the label.
+    w = labels.width
+    for piece in cut_pieces(labels, ends, label):
+        group.remove_cells(piece, w)
+        new = group_from_indices(len(groups), piece, w, coord)
+        groups += [new]
+        paint(labels, new, len(groups))
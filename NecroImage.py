@@ -0,0 +1,446 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+# Headless image export. A map is drawn either with the
+# glyphs of the tcod font (tiles), or as one block of colour
+# per cell (pixels) for maps too big to read as text. PNGs
+# are read and written with zlib, so nothing but the
+# standard library is needed, and no window is ever opened.
+# Every image is built a pixel row at a time, each row one
+# join of cached glyph rows or one translate of the cells.
+
+# -----------------------------------------------------------------------------
+
+
+import os
+import zlib
+import struct
+from functools import lru_cache
+
+import NecroText
+
+# -----------------------------------------------------------------------------
+
+
+# the font tcod_test.py uses, in tcod's layout.
+FONT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                    'courier12x12.png')
+TILE = 12
+
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+
+PNG_MAGIC = b'\x89PNG\r\n\x1a\n'
+
+# channels in a pixel, by png colour type.
+PNG_CHANNELS = {0: 1, 2: 3, 4: 2, 6: 4}
+
+# -----------------------------------------------------------------------------
+
+
+# where each char sits in a font laid out like tcod's.
+def tcod_layout():
+    """
+    Return a dict of char to tile number, for the chars of
+    FONT_LAYOUT_TCOD that are plain ascii. The other tiles
+    hold box drawing and arrows, which maps never use.
+    """
+
+    layout = {}
+
+    for i in range(0, 32):
+        layout[chr(0x20 + i)] = i
+    for i, c in enumerate('@[\\]^_`{|}~'):
+        layout[c] = 32 + i
+    for i in range(0, 26):
+        layout[chr(ord('A') + i)] = 96 + i
+        layout[chr(ord('a') + i)] = 128 + i
+
+    return layout
+
+# -----------------------------------------------------------------------------
+
+
+# png chunks are a length, a type, the data and a crc.
+def png_chunk(kind, data):
+    return (struct.pack('>I', len(data)) + kind + data +
+            struct.pack('>I', zlib.crc32(kind + data)))
+
+# -----------------------------------------------------------------------------
+
+
+# undo the filter on one png row.
+def unfilter(kind, row, prior, bpp):
+    """
+    Return the raw bytes of a row from its filtered bytes,
+    given the filter type, the raw row above it and the
+    bytes per pixel.
+    """
+
+    if kind == 0:
+        return row
+    if kind == 2:
+        return bytearray((a + b) & 0xff for a, b in zip(row, prior))
+
+    out = bytearray(row)
+
+    for i in range(0, len(out)):
+        left = out[i - bpp] if i >= bpp else 0
+        up = prior[i]
+
+        if kind == 1:
+            out[i] = (out[i] + left) & 0xff
+        elif kind == 3:
+            out[i] = (out[i] + (left + up) // 2) & 0xff
+        elif kind == 4:
+            corner = prior[i - bpp] if i >= bpp else 0
+            p = left + up - corner
+            pa, pb, pc = abs(p - left), abs(p - up), abs(p - corner)
+            if pa <= pb and pa <= pc:
+                out[i] = (out[i] + left) & 0xff
+            elif pb <= pc:
+                out[i] = (out[i] + up) & 0xff
+            else:
+                out[i] = (out[i] + corner) & 0xff
+        else:
+            raise ValueError('bad png filter type {}'.format(kind))
+
+    return out
+
+# -----------------------------------------------------------------------------
+
+
+# read an 8 bit, non interlaced png.
+def read_png(path):
+    """
+    Return (width, height, channels, pixels) for the png at
+    path, with pixels as bytes, row after row. Only the 8
+    bit grey, grey and alpha, rgb and rgba pngs without
+    interlacing are read, which covers the bundled font, a
+    ValueError is raised for anything else.
+    """
+
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    if data[:8] != PNG_MAGIC:
+        raise ValueError('{} is not a png'.format(path))
+
+    pos = 8
+    header = None
+    idat = []
+
+    while pos < len(data):
+        size, kind = struct.unpack_from('>I4s', data, pos)
+        body = data[pos+8:pos+8+size]
+        pos += 12 + size
+
+        if kind == b'IHDR':
+            header = struct.unpack('>IIBBBBB', body)
+        elif kind == b'IDAT':
+            idat += [body]
+        elif kind == b'IEND':
+            break
+
+    if header is None:
+        raise ValueError('{} has no png header'.format(path))
+
+    width, height, depth, colour, _, _, interlace = header
+    if depth != 8 or colour not in PNG_CHANNELS or interlace:
+        raise ValueError('{} is not an 8 bit, non interlaced grey or rgb '
+                         'png'.format(path))
+
+    channels = PNG_CHANNELS[colour]
+    stride = width * channels
+    raw = zlib.decompress(b''.join(idat))
+
+    rows = []
+    prior = bytes(stride)
+    for y in range(0, height):
+        start = y * (stride + 1)
+        prior = unfilter(raw[start], raw[start+1:start+1+stride], prior,
+                         channels)
+        rows += [bytes(prior)]
+
+    return width, height, channels, b''.join(rows)
+
+# -----------------------------------------------------------------------------
+
+
+# write rgb pixels out as a png.
+def write_png(path, width, height, rgb, level=6):
+    """
+    Write width by height rgb pixels (bytes, row after row)
+    to path as a png, every row unfiltered.
+    """
+
+    stride = width * 3
+    raw = b''.join(b'\x00' + rgb[y*stride:(y+1)*stride]
+                   for y in range(0, height))
+
+    with open(path, 'wb') as f:
+        f.write(PNG_MAGIC)
+        f.write(png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height,
+                                                8, 2, 0, 0, 0)))
+        f.write(png_chunk(b'IDAT', zlib.compress(raw, level)))
+        f.write(png_chunk(b'IEND', b''))
+
+# -----------------------------------------------------------------------------
+
+
+# write rgb pixels out as a binary ppm.
+def write_ppm(path, width, height, rgb):
+    with open(path, 'wb') as f:
+        f.write('P6\n{} {}\n255\n'.format(width, height).encode('ascii'))
+        f.write(rgb)
+
+# -----------------------------------------------------------------------------
+
+
+# lay three channels side by side as rgb.
+def interleave(r, g, b):
+    out = bytearray(3 * len(r))
+    out[0::3] = r
+    out[1::3] = g
+    out[2::3] = b
+    return bytes(out)
+
+# -----------------------------------------------------------------------------
+
+
+# the table that blends a coverage byte between two colours.
+def blend_table(fg, bg):
+    """
+    Return three 256 byte tables for bytes.translate, one per
+    channel, taking a glyph's coverage to bg at 0 and fg at
+    255.
+    """
+
+    return [bytes((b + (f - b) * a // 255) for a in range(0, 256))
+            for f, b in zip(fg, bg)]
+
+# -----------------------------------------------------------------------------
+
+
+class Tileset(object):
+    """
+    The glyphs of a greyscale font image, cut into tiles.
+    Each glyph is coloured once per (char, fg, bg) and then
+    kept, as a tuple of pixel rows of rgb bytes, so drawing
+    a map only ever joins rows that already exist.
+    """
+
+    # -------------------------------------------------------------------------
+
+
+    # constructor
+    def __init__(self, path=FONT, tile_w=TILE, tile_h=TILE, layout=None):
+        self.tile_w = tile_w
+        self.tile_h = tile_h
+        self.layout = layout if layout is not None else tcod_layout()
+        self.glyphs = {}
+
+        width, height, channels, pixels = read_png(path)
+
+        # the coverage is the alpha if there is one, else
+        # the grey level (of the red channel, for rgb).
+        pick = channels - 1 if channels in (2, 4) else 0
+        coverage = pixels[pick::channels]
+
+        # cut the coverage into tiles, left to right and
+        # then top to bottom, as rows of tile_w bytes.
+        self.tiles = []
+        for ty in range(0, height // tile_h):
+            for tx in range(0, width // tile_w):
+                self.tiles += [tuple(
+                    coverage[(ty*tile_h + y)*width + tx*tile_w:
+                             (ty*tile_h + y)*width + (tx+1)*tile_w]
+                    for y in range(0, tile_h))]
+
+    # -------------------------------------------------------------------------
+
+
+    # give back the coloured pixel rows of a char.
+    def glyph(self, char, fg=WHITE, bg=BLACK):
+        """
+        Return the char's tile as tile_h rows of rgb bytes in
+        fg on bg. Chars missing from the font are drawn as a
+        space.
+        """
+
+        key = (char, fg, bg)
+        if key not in self.glyphs:
+            r, g, b = blend_table(fg, bg)
+            tile = self.tiles[self.layout.get(char, self.layout[' '])]
+            self.glyphs[key] = tuple(interleave(row.translate(r),
+                                                row.translate(g),
+                                                row.translate(b))
+                                     for row in tile)
+
+        return self.glyphs[key]
+
+# -----------------------------------------------------------------------------
+
+
+# load a font once per process.
+@lru_cache(maxsize=8)
+def load_tileset(path=FONT, tile_w=TILE, tile_h=TILE):
+    return Tileset(path, tile_w, tile_h)
+
+# -----------------------------------------------------------------------------
+
+
+# the colour of a group label in pixel images.
+def group_colour(label):
+    """
+    Labels are spread over bright colours by stepping each
+    channel by a different prime, so groups next to each
+    other do not look alike. Label 0 (walls) is black.
+    """
+
+    if label == 0:
+        return BLACK
+
+    return (55 + label * 97 % 200, 55 + label * 57 % 200,
+            55 + label * 151 % 200)
+
+# -----------------------------------------------------------------------------
+
+
+# draw a grid with a glyph per cell.
+def render_tiles(grid, chars, tileset=None, fg=WHITE, bg=BLACK):
+    """
+    Return (width, height, rgb) of the grid drawn with the
+    tileset, the cell value v shown as the glyph of chars[v].
+    Each pixel row of the image is one join of glyph rows.
+    """
+
+    tileset = tileset or load_tileset()
+    glyphs = [tileset.glyph(c, fg, bg) for c in chars]
+
+    rows = []
+    for row in grid:
+        # zip the glyphs of the row, so each pixel row of it
+        # comes out as one tuple ready to join.
+        rows += [b''.join(line) for line in zip(*[glyphs[v] for v in row])]
+
+    return (grid.width * tileset.tile_w, grid.height * tileset.tile_h,
+            b''.join(rows))
+
+# -----------------------------------------------------------------------------
+
+
+# draw a grid with a block of colour per cell.
+def render_pixels(grid, colours, scale=1):
+    """
+    Return (width, height, rgb) of the grid with each cell
+    as a scale by scale block of colours[v]. Byte grids at
+    scale 1 are done with a translate per channel.
+    """
+
+    if grid.typecode == 'B' and scale == 1 and len(colours) <= 256:
+        pad = [BLACK] * (256 - len(colours))
+        tables = [bytes(c[i] for c in list(colours) + pad)
+                  for i in range(0, 3)]
+        cells = grid.tobytes()
+        rgb = interleave(*[cells.translate(t) for t in tables])
+        return grid.width, grid.height, rgb
+
+    blocks = [bytes(c) * scale for c in colours]
+
+    rows = []
+    for row in grid:
+        rows += [b''.join([blocks[v] for v in row])] * scale
+
+    return grid.width * scale, grid.height * scale, b''.join(rows)
+
+# -----------------------------------------------------------------------------
+
+
+# draw a map's cells or its groups.
+def render(m, which='map', mode='tiles', tileset=None, fg=WHITE, bg=BLACK,
+           scale=1):
+    """
+    Return (width, height, rgb) for the map (which='map') or
+    the group map (which='groups'). The tiles mode draws the
+    same chars print_map and print_groups do, the pixels
+    mode draws walls as bg, spaces as fg, and each group in
+    its own colour.
+    """
+
+    if which not in ('map', 'groups'):
+        raise ValueError('unknown grid {!r}, expected map or groups'
+                         .format(which))
+    if mode not in ('tiles', 'pixels'):
+        raise ValueError('unknown mode {!r}, expected tiles or pixels'
+                         .format(mode))
+
+    grid = m.map if which == 'map' else m.group_map
+
+    if mode == 'tiles':
+        if which == 'map':
+            chars = NecroText.map_chars(m)
+        else:
+            chars = NecroText.group_chars(m)
+        return render_tiles(grid, chars, tileset, fg, bg)
+
+    if which == 'map':
+        colours = [bg] * 256
+        colours[m.space_val] = fg
+    else:
+        colours = [group_colour(l) for l in range(0, len(m.groups) + 1)]
+        colours[0] = bg
+
+    return render_pixels(grid, colours, scale)
+
+# -----------------------------------------------------------------------------
+
+
+# save pixels in the format named by the file's extension.
+def save_image(path, width, height, rgb):
+    """
+    Write the rgb pixels to path as a png or a ppm, going by
+    the extension, or raise a ValueError for any other.
+    """
+
+    ext = os.path.splitext(path)[1].lower()
+
+    if ext == '.png':
+        write_png(path, width, height, rgb)
+    elif ext == '.ppm':
+        write_ppm(path, width, height, rgb)
+    else:
+        raise ValueError('unknown image type {!r}, expected .png or .ppm'
+                         .format(ext))
+
+# -----------------------------------------------------------------------------
+
+
+# render a map and save it in one go.
+def export(m, path, which='map', mode='tiles', tileset=None, fg=WHITE,
+           bg=BLACK, scale=1):
+    save_image(path, *render(m, which, mode, tileset, fg, bg, scale))
+
+# -----------------------------------------------------------------------------
+
+
+# if this file is run
+if __name__ == '__main__':
+
+    from NecroMapObj import Map
+
+    x = Map(24, 48)
+    export(x, 'thingo.png', 'groups')
+    export(x, 'thingo_pixels.png', 'groups', 'pixels', scale=4)
+
+# -----------------------------------------------------------------------------
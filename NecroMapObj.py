@@ -14,26 +14,59 @@
 
 import sqlite3
 import random
+import bisect
+import hashlib
+from array import array
+from itertools import compress
+from collections import deque
+from collections.abc import Sequence
+
+import NecroEngine
+import NecroGroups
+import NecroField
+import NecroFile
+import NecroImage
+import NecroProfile
+import NecroNoise
+import NecroText
+from NecroGrid import Grid, label_typecode
 
 # -----------------------------------------------------------------------------
 
 
 class Coordinate(object):
-    x = 0
-    y = 0
+    """
+    An immutable (y, x) pair. Coordinates compare and hash
+    by value, so they can be used in sets and as dict keys.
+    Inside of a map a cell can also be named by its flat
+    index, y * width + x, see index() and from_index().
+    """
+
+    __slots__ = ('y', 'x')
     
     def __init__(self, _y, _x):
-        self.x = _x
-        self.y = _y
+        object.__setattr__(self, 'x', _x)
+        object.__setattr__(self, 'y', _y)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Coordinate is immutable')
 
     def __eq__(self, o):
+        if not isinstance(o, Coordinate):
+            return NotImplemented
         return (self.y == o.y) and (self.x == o.x)
 
     def __str__(self):
         return '[{}, {} ]'.format(self.y, self.x)
+
+    def __repr__(self):
+        return 'Coordinate({}, {})'.format(self.y, self.x)
     
     def __hash__(self):
-        return id(self)
+        return hash((self.y, self.x))
+
+    def __reduce__(self):
+        return (Coordinate, (self.y, self.x))
 
     def mod(self, c):
         return Coordinate(self.y + c.y, self.x + c.x)
@@ -41,6 +74,48 @@ class Coordinate(object):
     def distance(self, c):
         return abs(self.y - c.y) + abs(self.x - c.x)
 
+    # the flat index of the coordinate in a map this wide.
+    def index(self, width):
+        return self.y * width + self.x
+
+    # build a coordinate back out of a flat index.
+    @classmethod
+    def from_index(cls, i, width):
+        return cls(*divmod(i, width))
+
+# -----------------------------------------------------------------------------
+
+
+class CoordView(Sequence):
+    """
+    A read only list of Coordinates over a sequence of flat
+    indices (an array, or a range for every cell). Each 
+    Coordinate is only made when it is asked for, so a view
+    costs no more than its indices.
+    """
+
+    __slots__ = ('width', 'cells')
+
+    def __init__(self, width, cells):
+        self.width = width
+        self.cells = cells
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return CoordView(self.width, self.cells[k])
+        return Coordinate.from_index(self.cells[k], self.width)
+
+    def __iter__(self):
+        w = self.width
+        for i in self.cells:
+            yield Coordinate.from_index(i, w)
+
+    def __repr__(self):
+        return 'CoordView({} cells)'.format(len(self.cells))
+
 # -----------------------------------------------------------------------------
 
 class Map(object):
@@ -59,69 +134,254 @@ class Map(object):
     group_map = []
     groups = []
 
-    # --
-    coords = []
-    walls = []
-    spaces = []
-
     # --
     directions = [Coordinate(-1, 0), Coordinate(1, 0),
                     Coordinate(0, -1), Coordinate(0, 1)]
     num_alive = 0
+    engine = None
+    rules = NecroEngine.DEFAULT_RULES
+    iterations_run = 0
+    seed = None
+    random = None
+    connect = True
+    profiler = None
+    density = 0.5
+    noise = 'white'
+
+    # --
+    version = 0
+    edits = None
+    edit_log_size = 256
+    views = None
+    groups_version = -1
 
     # -------------------------------------------------------------------------
 
 
     # constructor
-    def __init__(self, h, w):
+    def __init__(self, h, w, engine='python', rules=None, iterations=2,
+                 seed=None, connect=True, profiler=None, density=0.5,
+                 noise='white'):
         """
         Given that the width and height are correct, then 
         instantiate an array for map, count the alive cells
-        and get all neighbors.
+        and get all neighbors. The engine names which of the
+        NecroEngine backends plays the game of life, rules
+        are its birth/survival rules (a Rules or 'B4/S234'),
+        and iterations caps how many passes get played. The
+        same seed always makes the same map, if none is 
+        given one is picked and kept in seed. If connect is
+        set, tunnels are dug until the map is one cave. A
+        NecroProfile.Profiler can be passed in to time each
+        stage of building the map. The map starts out as the
+        named NecroNoise noise, with density of it walls.
+        """
+
+        self.setup(h, w, engine, rules, seed, profiler)
+        self.connect = connect
+        self.density = density
+        self.noise = noise
+
+        # generate a map and list of the neighbors.
+        with self.stage('noise'):
+            self.map = self.blank_array()
+        with self.stage('neighbors'):
+            self.neighbors = self.get_neighbors()
+
+        # play the game of life until the map settles, or
+        # we run out of iterations.
+        with self.stage('automaton'):
+            self.run_automaton(iterations)
+        self.count('iterations', self.iterations_run)
+
+        self.update_map()
+
+        # finish up the map, connecting the groups inside.
+        # self.finalize_map()
+
+    # -------------------------------------------------------------------------
+
+
+    # build a map around an existing grid of cells.
+    @classmethod
+    def from_grid(cls, grid, engine='python', rules=None, seed=None,
+                  neighbors=None, iterations_run=0, connect=False,
+                  profiler=None):
+        """
+        Make a map out of an already generated grid, without
+        rolling or smoothing it again. The neighbor counts 
+        are recounted unless they are handed in, and groups
+        are only connected if connect is set.
+        """
+
+        m = cls.__new__(cls)
+        m.setup(grid.height, grid.width, engine, rules, seed, profiler)
+        m.connect = connect
+
+        m.map = grid
+        if neighbors is None:
+            with m.stage('neighbors'):
+                neighbors = m.get_neighbors()
+        m.neighbors = neighbors
+        m.iterations_run = iterations_run
+        m.update_map()
+
+        return m
+
+    # -------------------------------------------------------------------------
+
+
+    # set the dimensions and settings of a new map.
+    def setup(self, h, w, engine, rules, seed, profiler=None):
+        """
+        Check the dimensions, then set them along with the 
+        engine, rules, profiler, and a private random 
+        generator made from the seed.
         """
 
         # verify that the dimensions are positive.
         if (h <= 0) or (w <= 0):
             assert(False)
 
-        # roll the random seed
-        random.seed()
+        # roll a seed if we were not given one, and keep it
+        # so the map can be made again.
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(32)
+
+        self.seed = seed
+        self.random = random.Random(seed)
+
+        # pick the engine and rules before anything needs 
+        # neighbors.
+        self.engine = NecroEngine.get_engine(engine)
+        self.rules = NecroEngine.make_rules(rules)
 
-        # set the dimensions, and generate a map and list
-        # of the neighbors.
         self.height = h
         self.width = w
-        self.map = self.blank_array()
-        self.neighbors = self.get_neighbors()
+        self.profiler = profiler
 
-        # play the game of life twice, hopefully it is 
-        # enough.
-        for _ in range(0,2):
-            self.game_of_life()
+    # -------------------------------------------------------------------------
 
-        self.update_map()
 
-        # finish up the map, connecting the groups inside.
-        # self.finalize_map()
+    # time a stage of building the map, if we are profiling.
+    def stage(self, name):
+        """
+        Return a context manager that times the with block 
+        as a stage of the map's profiler, or does nothing if
+        the map has no profiler.
+        """
+
+        if self.profiler is None:
+            return NecroProfile.NO_STAGE
+
+        return self.profiler.stage(name, self.height * self.width)
+
+    # -------------------------------------------------------------------------
+
+
+    # add to a counter, if we are profiling.
+    def count(self, name, n):
+        if self.profiler is not None:
+            self.profiler.count(name, n)
 
     # -------------------------------------------------------------------------
 
     # updates the map after it has changed
     def update_map(self):
         """
-        TODO
+        Find the groups in the map, joining them with tunnels
+        if the map is meant to be one cave, then recount the
+        alive cells and rebuild the coordinate lists and the
+        group map.
         """
 
-        # count the amount of cells that are alive, and
-        # create a list of all the groups insite.
-        self.num_alive = self.count_alive()
-        
-        self.coords = self.make_coord_list()
-        self.walls = [x for x in self.coords if self.map_coord(x) == self.wall_val]
-        self.spaces = [y for y in self.coords if self.map_coord(y) == self.space_val]
-        self.groups = self.get_groupings()
-        self.make_group_map()
-        self.connect_groups()
+        # create a list of all the groups insite, and if we
+        # dig any tunnels, find them again.
+        with self.stage('groups'):
+            self.groups = self.get_groupings()
+        self.count('groups_found', len(self.groups))
+
+        if self.connect:
+            with self.stage('connect'):
+                connected = self.connect_groups()
+            if connected:
+                with self.stage('groups'):
+                    self.groups = self.get_groupings()
+
+        # count the amount of cells that are alive.
+        with self.stage('counting'):
+            self.num_alive = self.count_alive()
+
+        # the walls and spaces are only found again when
+        # they are next asked for.
+        self.views = None
+
+        with self.stage('group_map'):
+            self.make_group_map()
+
+        # anything could have changed, caches start over.
+        self.mark_rebuilt()
+        self.groups_version = self.version
+
+    # -------------------------------------------------------------------------
+
+
+    # note that some cells of the map were changed.
+    def mark_changed(self, indices):
+        """
+        Bump the map's version, and log the flat indices of
+        the cells that changed in it, so caches built on the
+        map can tell if a change touched them. Only the last
+        edit_log_size versions are logged.
+        """
+
+        if self.edits is None:
+            self.edits = deque(maxlen=self.edit_log_size)
+
+        self.version += 1
+        self.edits.append((self.version, tuple(indices)))
+
+    # -------------------------------------------------------------------------
+
+
+    # note that any of the map's cells may have changed.
+    def mark_rebuilt(self):
+        """
+        Bump the map's version and throw the change log away,
+        for changes made to the whole grid at once (a pass of
+        the automaton, digging tunnels, update_map). Every
+        older version then gets None from changes_since, so
+        caches built on the map are made again.
+        """
+
+        self.version += 1
+        self.edits = None
+
+    # -------------------------------------------------------------------------
+
+
+    # the cells changed since a version of the map.
+    def changes_since(self, version):
+        """
+        Return the set of flat indices changed after the
+        given version, or None if the log no longer goes back
+        that far.
+        """
+
+        if version == self.version:
+            return set()
+
+        logged = len(self.edits) if self.edits is not None else 0
+        if version < self.version - logged:
+            return None
+
+        changed = set()
+        for v, indices in reversed(self.edits):
+            if v <= version:
+                break
+            changed.update(indices)
+
+        return changed
 
     # tostring()
     def __str__(self):
@@ -141,13 +401,29 @@ class Map(object):
         m = []
 
         for row in self.group_map:
-            m += [str(row) + '\n']
+            m += [str([self.group_char(c) for c in row]) + '\n']
 
         return m
 
     # -------------------------------------------------------------------------
 
 
+    # turn a group label into the char that is printed.
+    def group_char(self, label):
+        """
+        Group labels are stored as ints, with 0 for walls. 
+        Walls are shown as a space, and group n as the n'th
+        letter (label 1 is 'A').
+        """
+
+        if label == 0:
+            return ' '
+
+        return chr(label + 64)
+
+    # -------------------------------------------------------------------------
+
+
     # Given a y and an x, verify that it is in the bounds
     # of the map array.
     def in_bounds(self, y, x):
@@ -181,6 +457,68 @@ class Map(object):
     # -------------------------------------------------------------------------
 
 
+    # return the value in map at a flat index, -1 is 
+    # returned if the index is out of the map's scope.
+    def map_index(self, i):
+        """
+        Return the value in the map at the flat index i
+        (y * width + x), the int form of map_coord.
+        """
+
+        if not 0 <= i < self.height * self.width:
+            return -1
+
+        return self.map.data[i]
+
+    # -------------------------------------------------------------------------
+
+
+    # list the flat indices of all cells holding a value.
+    def indices(self, v):
+        """
+        Return an array of the flat index of every cell equal
+        to v, without making any coordinates. The array is
+        made on first use and kept until the map changes, so
+        it must not be changed by the caller.
+        """
+
+        if self.views is None:
+            self.views = {}
+
+        made = self.views.get(v)
+        if made is None or made[0] != self.version:
+
+            # mark the cells equal to v with a 1, and pick
+            # their indices out in one pass.
+            table = bytes(int(b == v) for b in range(0, 256))
+            picks = self.map.data.tobytes().translate(table)
+            made = (self.version,
+                    array('l', compress(range(0, len(picks)), picks)))
+            self.views[v] = made
+
+        return made[1]
+
+    # -------------------------------------------------------------------------
+
+
+    # every coordinate of the map.
+    @property
+    def coords(self):
+        return CoordView(self.width, range(0, self.height * self.width))
+
+    # the coordinates of the walls.
+    @property
+    def walls(self):
+        return CoordView(self.width, self.indices(self.wall_val))
+
+    # the coordinates of the spaces.
+    @property
+    def spaces(self):
+        return CoordView(self.width, self.indices(self.space_val))
+
+    # -------------------------------------------------------------------------
+
+
     # assert that all of the rows in the array (a) are of 
     # size width, and that there are size length of them.
     def assert_array_size(self, fun_name, a):
@@ -214,28 +552,17 @@ class Map(object):
     # generates an array of H rows of 0s and 1s W long
     def blank_array(self):
         """
-        Create an array that is Height long, by creating 
-        rows that are Width long. These rows are either
-        walls or spaces, depending on a random value. Then
-        return it out.
+        Create a grid that is Height long by Width wide, 
+        with every cell drawn at once from the map's noise 
+        and random generator. A density share of the cells
+        are walls and the rest are spaces. Then return it 
+        out.
         """
 
-        # set up a return list.
-        return_array = []
-
-        # for height times, add a row to the return list
-        for _ in range(0, self.height):
-
-            temp = []
-
-            # for width times, add a random bit into the 
-            # current row.
-            for _ in range(0, self.width):
-                r = random.randint(0, 1)
-                temp += [self.space_val] if r == 0 else [self.wall_val]
-
-            # add the row into the return array.
-            return_array += [temp]
+        cells = NecroNoise.make_noise(self.noise, self.random, self.height,
+                                      self.width, self.density,
+                                      self.wall_val, self.space_val)
+        return_array = Grid(self.height, self.width, data=cells)
 
         # check the old map value, then return the array
         self.assert_array_size('blank_array', return_array)
@@ -251,16 +578,8 @@ class Map(object):
         values in it that match the saved space value. 
         """
 
-        # set the alive count to 0
-        num_alive = 0
-
-        # run through all cells in the map array, and if 
-        # the cell is a space cell, increment the alive 
-        # value.
-        for j in range(0, self.height):
-            for i in range(0, self.width):
-                if (self.map[j][i] == self.space_val):
-                    num_alive += 1
+        # the map grid can count the space cells itself.
+        num_alive = self.map.count(self.space_val)
 
         # check the map contents, and return the alive val.
         self.assert_array_size('count_alive', self.map)
@@ -314,29 +633,14 @@ class Map(object):
     def get_neighbors(self):
         """
         Pulls all the neighbor counts from all of the cells
-        inside of the map array. It then stores all of them
-        into an array which is then returned.
+        inside of the map array, using the map's engine, and
+        returns them as an array.
         """
 
-        # create an empty list for neighbors.
-        neighbors = []
-
-        # go through all of the rows in the map array
-        for j in range(0, self.height):
-          
-            row = []
-            
-            # go through the items in the row, and add the 
-            # amount of neighbors that item has to the 
-            # array.
-            for i in range(0, self.width):
-                row += [self.get_point_neighbor(j, i)]
-
-            # add the row into the neighbors array.
-            neighbors += [row]
+        neighbors = self.engine.get_neighbors(self)
 
         # check the map, and return the neighbors array.
-        self.assert_array_size('get_neighbors', self.neighbors)
+        self.assert_array_size('get_neighbors', neighbors)
         return neighbors
 
     # -------------------------------------------------------------------------
@@ -351,13 +655,11 @@ class Map(object):
         out.
         """
 
-        cs = []
-
-        # for all coordinate combinations, create a 
-        # coordinate obj, and add it to cs
-        for j in range(0, self.height):
-            for i in range(0, self.width):
-                cs += [Coordinate(j,i), ]
+        # for all flat indices, create a coordinate obj, and
+        # add it to cs
+        w = self.width
+        cs = [Coordinate.from_index(i, w)
+              for i in range(0, self.height * w)]
 
         # print(cs)
         
@@ -374,56 +676,15 @@ class Map(object):
     def get_groupings(self):
         """
         Parses the map and returns a list of all the groups
-        inside of it that are bounded by walls.
+        inside of it that are bounded by walls. Each group
+        is a NecroGroups.Group, which knows its size and its
+        bounding box, and iterates over its coordinates.
         """
 
-        # set up the groups return value
-        contig_groups = []
-        seen_coords = []
-        
-        for c in self.spaces:
-            
-            if c in seen_coords:
-                continue
-
-            new_coords = [c]
-            old_coords = []
-
-            while True:
-                
-                try:
-                    t = new_coords.pop()
-
-                    # if the item in this list has been 
-                    # looked at, skip it.
-                    if t in seen_coords:
-                        continue
-
-                    # add it to the old list, we dont need
-                    # to search it again.
-                    old_coords += [t]
-
-                    # generate the cardinal cells that are 
-                    # around the current coord.
-                    dirs = [x.mod(t) for x in self.directions]
-
-                    # go through all the cardinal directions
-                    # and check if they are space cells.
-                    for d in dirs:
-                        if self.map_coord(d) == self.space_val:
-                            # print('d in spaces', d)
-                            new_coords += [d]
-
-                    # we have searched all around t, we 
-                    # can put it into seen.
-                    seen_coords += [t]
-
-                except:
-                    # print('list exhausted')
-                    break
-            
-            # add the last group into the contiguous list.
-            contig_groups += [old_coords]
+        # label every 4-connected run of spaces in one
+        # linear pass over the map.
+        contig_groups = NecroGroups.label_groups(self.map, self.space_val,
+                                                 Coordinate)
 
         # return the list of groups
         return contig_groups
@@ -435,28 +696,23 @@ class Map(object):
     # and groups list has been made.
     def make_group_map(self):
         """
-        sets the group_map variable to be an array of 
-        arrays that holds a version of the map, but with 
-        different a specific letter to represent all items
-        inside of a contiguous group.
+        sets the group_map variable to be a grid that holds
+        a version of the map, but with a specific label to
+        represent all items inside of a contiguous group.
         """
       
-        # set the map to nil, then fill it with rows of 
-        # spaces to represent the walls in the map
-        self.group_map = []
-        for _ in range(0, self.height):
-            temp = []
-            for _ in range(0, self.width):
-                temp += [' ']
-            self.group_map += [temp]
+        # set the map to a grid of 0s to represent the walls
+        # in the map, wide enough to fit every label.
+        self.group_map = Grid(self.height, self.width,
+                              label_typecode(len(self.groups)))
 
         # start at group number 0, and set the value in the
-        # group's cells to 65 + group number, and convert
-        # it into a char. (chr(65) == 'A')
+        # group's cells to 1 + group number. (see group_char
+        # for how they get printed, label 1 is 'A')
         g_num = 0 
         for group in self.groups:
-            for c in group:
-                self.group_map[c.y][c.x] = str(chr(g_num + 65))
+            for y, x0, x1 in group.runs:
+                self.group_map.fill(y, x0, x1, g_num + 1)
             g_num += 1
 
         self.assert_array_size('make_group_map', self.group_map)
@@ -468,127 +724,243 @@ class Map(object):
     # of cells.
     def game_of_life(self):
         """
-        Snakes through the neighbors array, and checks the 
-        values of different cooridnates, based on the given
+        Hands the map to the engine, which checks the
+        neighbor count of every cooridnate, and based on the
         value, it either: dies, grows, or lives. Then it 
-        updates the neighbors array.
+        updates the neighbors array, and returns how many 
+        cells changed.
         """
 
-        # update the number of neighbors for all coords.
-        self.neighbors = self.get_neighbors()
-
-        # go through all of the cells in the map,. and play
-        # the Game of Life, with them based off neighbors.
-        for j in range(0, self.height):
-            for i in range(0, self.width):
-            
-                # dies of under population
-                if (0 <= self.neighbors[j][i] <= 1):
-                    self.map[j][i] = self.space_val
-                # survives if alive
-                elif (2 <= self.neighbors[j][i] <= 3):
-                    self.map[j][i] = self.map[j][i]
-                # becomes alive if 4
-                elif (4 == self.neighbors[j][i]):
-                    self.map[j][i] = self.wall_val
-                # dies of over population
-                if (5 <= self.neighbors[j][i]):
-                    self.map[j][i] = self.space_val
+        # play one pass with the map's engine, which also
+        # leaves the neighbors array up to date.
+        changed = self.engine.game_of_life(self)
+        if changed:
+            self.mark_rebuilt()
 
         # check to see if the array sizes are alright.
         self.assert_array_size('game_of_life', self.map)
+        self.assert_array_size('game_of_life', self.neighbors)
 
-        # update the number of neighbors for all coords.
-        self.neighbors = self.get_neighbors()
-
-        # return out
-        return
+        return changed
 
     # -------------------------------------------------------------------------
     
 
-    # TODO
-    # connects all the items in the groups to make a larger
-    # contigous map.
-    def connect_groups(self):
-        """
-        connect all groups of coordinates that are less 
-        then a specific value
+    # play the game of life until the map stops changing.
+    def run_automaton(self, max_iterations, cycle_length=4):
         """
+        Play up to max_iterations passes of the game of life.
+        Stops early once a pass changes no cells (a fixed 
+        point), or the map matches one of the last few maps
+        (a cycle of up to cycle_length passes), found by 
+        hashing the map after every pass. Returns the number
+        of passes played, which is also kept in 
+        iterations_run.
         """
-        end_group = [self.groups[0]]
 
-        if len(self.groups) == 1:
-            return end_group
+        # the starting map counts too, or a map that flips
+        # back to it plays one pass too many.
+        recent = [hashlib.blake2b(self.map.data, digest_size=16).digest()]
+        self.iterations_run = 0
 
-        for group in self.groups[1:]:
-            
-            if len(group) < 5: 
-                continue
-            
-            print(len(group))
+        for _ in range(0, max_iterations):
+
+            changed = self.game_of_life()
+            self.iterations_run += 1
 
-            closest_coord = group[0]
-            closest_dist = self.width
-            for coord in group[1:]:
-                for point in end_group:
-                    if coord.distance(point) < closest_dist:
-                        closest_coord = point
-                        closest_dist = coord.distance(point)
+            # nothing moved, more passes would not either.
+            if changed == 0:
+                break
 
-            print(closest_coord, closest_dist)
+            # we have seen this map lately, we are cycling.
+            digest = hashlib.blake2b(self.map.data, digest_size=16).digest()
+            if digest in recent:
+                break
+
+            recent = (recent + [digest])[-cycle_length:]
+
+        return self.iterations_run
+
+    # -------------------------------------------------------------------------
+
+
+    # connects all the items in the groups to make a larger
+    # contigous map.
+    def connect_groups(self):
         """
+        Dig the cheapest set of tunnels through the walls 
+        that joins every group into one, see 
+        NecroGroups.find_tunnels. The neighbors are recounted
+        after digging. Returns if anything was dug, the 
+        groups list is left for the caller to redo.
+        """
+
+        if len(self.groups) <= 1:
+            return False
 
-        return False
+        tunnels = NecroGroups.find_tunnels(self.map, self.groups)
+        for i in tunnels:
+            self.map.data[i] = self.space_val
+        self.count('tunnel_cells', len(tunnels))
+
+        self.neighbors = self.get_neighbors()
+        self.mark_rebuilt()
+        return True
 
     # -------------------------------------------------------------------------
     
 
-    # TODO
-    def get_map_string(self):
+    # change some cells, keeping everything else in step.
+    def set_cells(self, cells, value):
         """
-        TODO
+        Set every cell in cells, given as (y, x) pairs, 
+        Coordinates or flat indices, to value (wall_val or 
+        space_val). Instead of running update_map again, only
+        what the edit touches is redone: the neighbor counts
+        around each changed cell, the alive count, the wall
+        and space indices, and the groups next to each cell
+        (see NecroGroups.open_cell and close_cell). Group
+        labels are not put back in row major order. If the
+        map was changed since the groups were last found (say
+        by game_of_life), they are found again first. Returns 
+        the flat indices that actually changed.
         """
 
-        text = ''
-        
-        for j in range(0, 2):
-            if (j == 0): text += '   '
-            else: text += ' |'
+        if value not in (self.wall_val, self.space_val):
+            raise ValueError('cells can only be set to {} or {}'.format(
+                self.wall_val, self.space_val))
+
+        # the groups are only kept up to date by edits, so
+        # bring them in line with the map before editing.
+        if self.groups_version != self.version:
+            self.groups = self.get_groupings()
+            self.num_alive = self.count_alive()
+            self.make_group_map()
+            self.groups_version = self.version
+
+        w = self.width
+        data = self.map.data
+        opened = value == self.space_val
+        step = 1 if opened else -1
+
+        # the wall and space indices that are already made
+        # are kept up to date, the rest are left to indices.
+        made = {}
+        for v, (version, kept) in (self.views or {}).items():
+            if version == self.version:
+                made[v] = kept
+        take = made.get(self.wall_val if opened else self.space_val)
+        give = made.get(value)
+
+        changed = []
+        for cell in cells:
+            i = self.cell_index(cell)
+            if data[i] == value:
+                continue
 
-            # for each column in the row, print out the col
-            # number, or a hyphen if its the second row
-            for i in range(0, self.width):
+            data[i] = value
+            changed += [i]
+            y, x = divmod(i, w)
+
+            # the 8 cells around this one gain or lose a space.
+            for j in range(max(0, y - 1), min(self.height, y + 2)):
+                row = self.neighbors[j]
+                for k in range(max(0, x - 1), min(w, x + 2)):
+                    if (j, k) != (y, x):
+                        row[k] += step
+
+            self.num_alive += step
+
+            if take is not None:
+                del take[bisect.bisect_left(take, i)]
+            if give is not None:
+                give.insert(bisect.bisect_left(give, i), i)
+
+            # make room for the labels an edit can add, one
+            # for an opened cell, up to three for a split.
+            typecode = label_typecode(len(self.groups) + 3)
+            if typecode != self.group_map.typecode:
+                self.group_map = Grid(self.height, w, typecode,
+                                      data=array(typecode,
+                                                 self.group_map.data))
+
+            if opened:
+                NecroGroups.open_cell(self.group_map, self.groups, y, x,
+                                      Coordinate)
+            else:
+                NecroGroups.close_cell(self.group_map, self.groups, y, x,
+                                       Coordinate)
 
-                if (j == 0): 
-                    text += '{} '.format((i%10+1)%10)
-                else: 
-                    text += '--'
+        if changed:
+            # let the engine catch up on what changed, or if it
+            # cannot, forget what it was tracking.
+            if hasattr(self.engine, 'note_changes'):
+                self.engine.note_changes(self, changed)
+            elif hasattr(self.engine, 'reset'):
+                self.engine.reset()
+            self.mark_changed(changed)
+            self.groups_version = self.version
 
-            if j == 0: 
-                text += '\n' 
-            else:
-                text += '-|\n'
+            for v, kept in made.items():
+                self.views[v] = (self.version, kept)
 
-        for row, i in zip(self.group_map, range(0, len(self.map))):
+        return changed
 
-            text += str((i%10+1)%10) + '| '
+    # -------------------------------------------------------------------------
 
-            for char in row:
-                text += char + ' '
 
-            if j == 0: m += '\n' 
-            else: text += '|\n'
-        
-        text += ' |'
+    # open up some walls.
+    def open_cells(self, cells):
+        return self.set_cells(cells, self.space_val)
 
-        for i in range(0, self.width):
-            text += '--'
-    
-        text += '-|'
+    # -------------------------------------------------------------------------
 
-        return text
 
+    # fill in some spaces.
+    def close_cells(self, cells):
+        return self.set_cells(cells, self.wall_val)
+
+    # -------------------------------------------------------------------------
+
+
+    # set a single cell.
+    def set_cell(self, y, x, value):
+        return self.set_cells([(y, x)], value)
+
+    # -------------------------------------------------------------------------
+
+
+    # turn a cell given any way into a flat index.
+    def cell_index(self, cell):
+        """
+        Cells can be flat indices, (y, x) pairs or
+        Coordinates. Raises an IndexError for a cell outside
+        of the map.
+        """
+
+        if isinstance(cell, int):
+            y, x = divmod(cell, self.width)
+        elif isinstance(cell, Coordinate):
+            y, x = cell.y, cell.x
+        else:
+            y, x = cell
+
+        if not self.in_bounds(y, x):
+            raise IndexError('cell {} is outside of the map'.format(cell))
+
+        return y * self.width + x
+
+    # -------------------------------------------------------------------------
+
+
+    # the group map inside a numbered box, as one string.
+    def get_map_string(self):
+        """
+        Returns the group map boxed in, with the rows and 
+        columns numbered from 1. See NecroText.boxed_lines.
+        """
+
+        return ''.join(NecroText.boxed_lines(self))
 
     # -------------------------------------------------------------------------
 
@@ -601,36 +973,9 @@ class Map(object):
         indecies into a given row.
         """
 
-        text = ''
-
-        # print out the starting two chars for the first 
-        # two rows
-        for j in range(0, 2):
-            
-            if (j == 0):
-                text += '   '
-                # print('   ', end='')
-            else: 
-                text += ' |'
-                # print(' |', end='')
-
-            # for each column in the row, print out the col
-            # number, or a hyphen if its the second row
-            for i in range(0, self.width):
-                
-                if (j == 0): 
-                    text += '{} '.format(i%10)
-                    # print('{}'.format(i%10), end=' ')
-                else: 
-                    text += '--'
-                    # print('--', end='')
-
-            text += '\n'
-            # print()
-
         # check the map array.
         self.assert_array_size('print_header', self.map)
-        return text
+        return ''.join(NecroText.header_lines(self.width))
 
     # -------------------------------------------------------------------------
 
@@ -640,40 +985,12 @@ class Map(object):
     def print_map(self):
         """
         Prints out all rows in the map with corresponding
-        row numbers.
+        row numbers. To stream a big map out without
+        building the string, use write_text.
         """
 
-        text = ''
-
-        # print out a starting message, and print headers.
-        # print('printing map')
-        text += self.print_header()
-
-        # print out the row numbers and the contents of the
-        # rows, with the values in the map represented by
-        # space and wall characters.
-        for j in range(0, self.height):
-
-            text += '{}| '.format(j%10)
-            # print('{}|'.format(j%10), end=' ')
-
-            for i in range(0, self.width):
-
-                if (self.map[j][i] == self.space_val):
-                    text += '{} '.format(self.space)
-                    # print(self.space, end=' ')
-
-                else: 
-                    text += '{} '.format(self.wall)
-                    # print(self.wall, end=' ')
-
-            text += '\n'
-            # print()
-
-        # print the ending message, then check the map.
-        # print('end of map\n')
         self.assert_array_size('print_map', self.map)
-        return text
+        return ''.join(NecroText.map_lines(self))
 
     # -------------------------------------------------------------------------
 
@@ -686,31 +1003,8 @@ class Map(object):
         neighbors array, with corresponding row numbers.
         """
 
-        text = ''
-
-        # print out a status message, and headers.
-        # print('printing neighbors')
-        text += self.print_header()
-
-        # go through all cells in the map, printing the row 
-        # number before the row's contents
-        for j in range(0, self.height):
-        
-            text += '{}| '.format((1+j)%10)
-            # print('{}|'.format((1+j)%10), end=' ')
-        
-            for i in range(0, self.width):
-                text += '{} '.format(self.neighbors[j][i])
-                # print(self.neighbors[j][i], end=' ')
-        
-            text += '\n'
-            # print()
-
-        # print out the end message, and check the map
-        # print('end of neighbors\n')
         self.assert_array_size('print_neighbors', self.neighbors)
-
-        return text
+        return ''.join(NecroText.neighbor_lines(self))
 
     # -------------------------------------------------------------------------
 
@@ -720,37 +1014,36 @@ class Map(object):
         """
         print out the map using the current groups that are
         stored. uses a char to designate a grouping (starts
-        at 'a'), with walls being spaces.
+        at 'A'), with walls being spaces.
         """
 
-        text = ''
+        self.assert_array_size('print_groups', self.group_map)
+        return ''.join(NecroText.group_lines(self))
 
-        # print out a starting message, and print headers.
-        # print('printing groups')
-        text += self.print_header()
+    # -------------------------------------------------------------------------
 
-        # print out the row numbers and the contents of the
-        # rows, with the values in m represented by groups
-        # and wall characters.
-        for j in range(0, self.height):
 
-            text += '{}| '.format(j%10)
-            # print('{}|'.format(j%10), end=' ')
-          
-            for i in range(0, self.width):
-                text += '{} '.format(self.group_map[j][i])
-                # print(self.group_map[j][i], end=' ')
+    # stream one of the printouts to a file-like object.
+    def write_text(self, f, which='map'):
+        """
+        writes the map, neighbors or groups printout (which)
+        to f a line at a time, so even huge maps never have
+        the whole string in memory.
+        """
 
-            text += '\n'
-            # print()
+        lines = {
+            'map': NecroText.map_lines,
+            'neighbors': NecroText.neighbor_lines,
+            'groups': NecroText.group_lines,
+        }
 
-        # print the ending message, then check the map.
-        # print('end of groups\n')
-        self.assert_array_size('print_groups', self.group_map)
-        
-        return text
+        if which not in lines:
+            raise ValueError('unknown printout {!r}, expected one of {}'
+                             .format(which, ', '.join(sorted(lines))))
 
-    # -----------------------------------------------------------------------------
+        NecroText.write_lines(lines[which](self), f)
+
+    # -------------------------------------------------------------------------
 
 
     # write the array (a) to a specified output file.
@@ -760,23 +1053,73 @@ class Map(object):
         to delimit the different cells.
         """
 
-        # open the output file, deleting the past version
-        with open(output, 'w+') as output_file:
-            for line in a:
+        # group labels are stored as ints, write them out as
+        # their letters.
+        to_char = self.group_char if a is self.group_map else str
 
-                out_line = ''
-              
-                # go through the lines in the array, adding all
-                # items with a space after. add '\n' at the end
-                for item in line:
-                    # print(item)
-                    out_line += item + ' '
-
-                output_file.write(out_line + '\n')
+        # open the output file, deleting the past version,
+        # and write it a row at a time.
+        with open(output, 'w+') as output_file:
+            NecroText.write_lines(NecroText.array_lines(a, to_char),
+                                  output_file)
 
         self.assert_array_size('print_to_file', a)
         return
 
+    # -------------------------------------------------------------------------
+
+
+    # save the map in the binary map file format.
+    def write_to_file(self, output):
+        """
+        writes the map's settings, cells and group labels
+        to the provided file, see NecroFile for the layout.
+        """
+
+        NecroFile.write_map(self, output)
+
+    # -------------------------------------------------------------------------
+
+
+    # make a field of distances to the nearest of sources.
+    def distance_field(self, sources, max_distance=None):
+        """
+        returns a NecroField.DistanceField for the sources,
+        which agents can walk down a step at a time, and
+        which can be updated as the sources move.
+        """
+
+        return NecroField.DistanceField(self, sources, max_distance)
+
+    # -------------------------------------------------------------------------
+
+
+    # save a picture of the map, without opening a window.
+    def write_image(self, output, which='map', mode='tiles', scale=1):
+        """
+        writes the map or groups (which) to a .png or .ppm
+        file, drawn with the tcod font's glyphs (tiles) or a
+        block of colour per cell (pixels), see NecroImage.
+        """
+
+        NecroImage.export(self, output, which, mode, scale=scale)
+
+    # -------------------------------------------------------------------------
+
+
+    # load a map back from a binary map file.
+    @classmethod
+    def read_from_file(cls, input_name, engine='python'):
+        """
+        reads a map saved by write_to_file, without 
+        generating it again. to read only some rows, open
+        the file with NecroFile.MapFile instead.
+        """
+
+        with NecroFile.MapFile(input_name) as f:
+            return cls.from_grid(f.cells(), engine, f.rules, f.seed,
+                                 iterations_run=f.iterations_run)
+
 # -----------------------------------------------------------------------------
 
 
@@ -801,7 +1144,9 @@ if __name__ == '__main__':
     # write groups to file 
     x.print_to_file('thingo.txt', x.group_map)
     
-    # 
-    # x.read_from_file('thingo.txt')
+    # save the map, and read it back in.
+    x.write_to_file('thingo.map')
+    y = Map.read_from_file('thingo.map')
+    print('read back a map: ' + str(y) + '\n')
 
 # -----------------------------------------------------------------------------
@@ -0,0 +1,133 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+
+import bisect
+from array import array
+from itertools import accumulate
+
+# -----------------------------------------------------------------------------
+
+
+# how finely value noise is cut up to find its density.
+LEVELS = 1 << 16
+
+# -----------------------------------------------------------------------------
+
+
+# make the table that turns a random byte into a cell.
+def threshold_table(density, wall, space):
+    """
+    Return a 256 byte table for bytes.translate, sending
+    the lowest density share of byte values to wall and the
+    rest to space.
+    """
+
+    cut = int(round(density * 256))
+    return bytes(wall if b < cut else space for b in range(0, 256))
+
+# -----------------------------------------------------------------------------
+
+
+# fill a grid's worth of cells with white noise.
+def white_noise(rng, h, w, density=0.5, wall=0, space=1):
+    """
+    Draw h * w random bytes from the generator (rng) in one
+    call, and turn each into a wall with the chance of
+    density, or else a space. Returns the cells as bytes.
+    """
+
+    return rng.randbytes(h * w).translate(threshold_table(density, wall,
+                                                          space))
+
+# -----------------------------------------------------------------------------
+
+
+# fill a grid's worth of cells with smooth value noise.
+def value_noise(rng, h, w, density=0.5, wall=0, space=1, scale=8,
+                jitter=0.25):
+    """
+    Put a random value on a lattice point every scale cells,
+    blend between them to get a smooth field, mix in jitter
+    parts of white noise, and make the lowest density share
+    of the field walls. The blended values bunch up around
+    the middle, so the cut is taken from a histogram of the
+    field rather than at density itself. The cells come out
+    in blobs, so the automaton has less to clean up. Returns
+    the cells as bytes.
+    """
+
+    lh = h // scale + 2
+    lw = w // scale + 2
+    lattice = [[rng.random() for _ in range(0, lw)] for _ in range(0, lh)]
+
+    # where each column sits between its lattice points.
+    cols = [(x // scale, (x % scale) / scale) for x in range(0, w)]
+
+    # the field, as one of LEVELS levels per cell.
+    levels = array('H', [0]) * (h * w)
+    counts = [0] * LEVELS
+    smooth = 1.0 - jitter
+
+    for y in range(0, h):
+
+        j, fy = y // scale, (y % scale) / scale
+        top, bottom = lattice[j], lattice[j + 1]
+
+        # blend the two lattice rows first, so each cell only
+        # has to blend along x.
+        row = [a + (b - a) * fy for a, b in zip(top, bottom)]
+        white = rng.randbytes(w)
+
+        start = y * w
+        for x in range(0, w):
+            i, fx = cols[x]
+            v = row[i] + (row[i + 1] - row[i]) * fx
+            q = int((smooth * v + jitter * white[x] / 256) * LEVELS)
+            levels[start + x] = q
+            counts[q] += 1
+
+    # the levels below cut hold as close to a density share
+    # of the cells as the levels allow, without going over.
+    cut = bisect.bisect_right(list(accumulate(counts)),
+                              int(round(density * h * w)))
+
+    table = [wall] * cut + [space] * (LEVELS - cut)
+    return bytes(map(table.__getitem__, levels))
+
+# -----------------------------------------------------------------------------
+
+
+# the noise a map can be started from, by name.
+NOISES = {
+    'white': white_noise,
+    'value': value_noise,
+}
+
+# -----------------------------------------------------------------------------
+
+
+# make the starting cells of a map.
+def make_noise(name, rng, h, w, density=0.5, wall=0, space=1):
+    """
+    Return h * w cells of the named noise as an array of
+    bytes, or raise a ValueError for an unknown name.
+    """
+
+    if name not in NOISES:
+        raise ValueError('unknown noise {!r}, expected one of {}'.format(
+            name, ', '.join(sorted(NOISES))))
+
+    return array('B', NOISES[name](rng, h, w, density, wall, space))
+
+# -----------------------------------------------------------------------------
@@ -0,0 +1,421 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+# Hierarchical pathfinding (HPA*). The map is cut into
+# square clusters. Where two clusters share open cells along
+# their edge there are entrances, and the cells on either
+# side of an entrance are the nodes of a small abstract
+# graph, joined across the edge with a cost of 1 and inside
+# each cluster by the length of the shortest path between
+# them that stays in the cluster. A long path is found by an
+# A* over that graph, then each hop is filled in with a
+# search inside one cluster, which is cached. Cells in
+# different groups can never reach each other, so those
+# queries are answered from the group map without a search.
+
+# -----------------------------------------------------------------------------
+
+
+import heapq
+from collections import deque
+
+# -----------------------------------------------------------------------------
+
+
+# entrances at least this long get a node at both ends,
+# shorter ones only get one in the middle.
+LONG_ENTRANCE = 6
+
+# -----------------------------------------------------------------------------
+
+
+class PathFinder(object):
+    """
+    The abstract graph of a map cut into cluster_size square
+    clusters. It follows the map's edits through its version
+    and change log (see Map.set_cells): when cells change,
+    only the clusters they are in (and the entrances on the
+    edges they are on) are worked out again, and only those
+    clusters' cached paths are dropped.
+    """
+
+    # -------------------------------------------------------------------------
+
+
+    # constructor
+    def __init__(self, m, cluster_size=16):
+        self.m = m
+        self.size = cluster_size
+        self.rows = (m.height + cluster_size - 1) // cluster_size
+        self.cols = (m.width + cluster_size - 1) // cluster_size
+
+        # counters for how each hop was filled in.
+        self.hits = 0
+        self.misses = 0
+
+        self.rebuild()
+
+    # -------------------------------------------------------------------------
+
+
+    # the cluster a flat index is in.
+    def cluster_of(self, i):
+        y, x = divmod(i, self.m.width)
+        return (y // self.size, x // self.size)
+
+    # the rows and columns of a cluster, as y0, x0, y1, x1.
+    def bounds(self, c):
+        cy, cx = c
+        return (cy * self.size, cx * self.size,
+                min(self.m.height, (cy + 1) * self.size),
+                min(self.m.width, (cx + 1) * self.size))
+
+    # the edges between a cluster and the ones around it,
+    # each named by its two clusters, top or left first.
+    def borders_of(self, c):
+        cy, cx = c
+        out = []
+        if cx + 1 < self.cols:
+            out += [(c, (cy, cx + 1))]
+        if cx > 0:
+            out += [((cy, cx - 1), c)]
+        if cy + 1 < self.rows:
+            out += [(c, (cy + 1, cx))]
+        if cy > 0:
+            out += [((cy - 1, cx), c)]
+        return out
+
+    # -------------------------------------------------------------------------
+
+
+    # find the entrances along the edge between two clusters.
+    def find_entrances(self, border):
+        """
+        Return the (a, b) flat index pairs that cross the
+        edge, a in the first cluster and b in the second. A
+        run of open pairs along the edge is one entrance,
+        crossed in its middle, or at both ends if it is long.
+        """
+
+        (cy, cx), (dy, dx) = border
+        w = self.m.width
+        cells = self.m.map.data
+        space = self.m.space_val
+        y0, x0, y1, x1 = self.bounds((cy, cx))
+
+        # the cell pairs along the edge, in order.
+        if dx != cx:
+            pairs = [(y * w + x1 - 1, y * w + x1) for y in range(y0, y1)]
+        else:
+            pairs = [((y1 - 1) * w + x, y1 * w + x) for x in range(x0, x1)]
+
+        out = []
+        run = []
+        for a, b in pairs + [(None, None)]:
+            if a is not None and cells[a] == space and cells[b] == space:
+                run += [(a, b)]
+                continue
+            if len(run) >= LONG_ENTRANCE:
+                out += [run[0], run[-1]]
+            elif run:
+                out += [run[len(run) // 2]]
+            run = []
+
+        return out
+
+    # -------------------------------------------------------------------------
+
+
+    # the rows and columns of the clusters of two cells,
+    # if they are next to each other, or None.
+    def around(self, cs, cg):
+        if abs(cs[0] - cg[0]) > 1 or abs(cs[1] - cg[1]) > 1:
+            return None
+
+        y0, x0, _, _ = self.bounds((min(cs[0], cg[0]), min(cs[1], cg[1])))
+        _, _, y1, x1 = self.bounds((max(cs[0], cg[0]), max(cs[1], cg[1])))
+        return (y0, x0, y1, x1)
+
+    # -------------------------------------------------------------------------
+
+
+    # the shortest paths from a cell that stay in a box.
+    def search(self, box, start, goal=None):
+        """
+        Breadth first search from start over the open cells
+        inside box (y0, x0, y1, x1, as bounds gives), stopping
+        early once goal is reached. Returns a dict of every
+        reached cell to the cell it was reached from (start
+        maps to None).
+        """
+
+        w = self.m.width
+        cells = self.m.map.data
+        space = self.m.space_val
+        y0, x0, y1, x1 = box
+
+        parent = {start: None}
+        queue = deque([start])
+        while queue:
+            i = queue.popleft()
+            if i == goal:
+                break
+            y, x = divmod(i, w)
+            for j, ok in ((i - w, y > y0), (i + w, y < y1 - 1),
+                          (i - 1, x > x0), (i + 1, x < x1 - 1)):
+                if ok and j not in parent and cells[j] == space:
+                    parent[j] = i
+                    queue.append(j)
+
+        return parent
+
+    # walk a search's parents back into a path.
+    def walk(self, parent, goal):
+        path = []
+        while goal is not None:
+            path += [goal]
+            goal = parent[goal]
+        return path[::-1]
+
+    # the steps from a cell to every cell in a set, in a cluster.
+    def distances(self, c, start, targets):
+        parent = self.search(self.bounds(c), start)
+
+        # the parents were found in breadth first order, so
+        # each one's depth is known before its children's.
+        depth = {}
+        for j, p in parent.items():
+            depth[j] = 0 if p is None else depth[p] + 1
+
+        return {t: depth[t] for t in targets if t in parent}
+
+    # -------------------------------------------------------------------------
+
+
+    # work out the whole abstract graph.
+    def rebuild(self):
+        self.version = self.m.version
+
+        self.inter = {}
+        self.links = {}
+        self.nodes = {}
+        self.intra = {}
+        self.refined = {}
+
+        clusters = [(cy, cx) for cy in range(0, self.rows)
+                    for cx in range(0, self.cols)]
+
+        borders = set(b for c in clusters for b in self.borders_of(c))
+        for b in borders:
+            self.set_border(b)
+        for c in clusters:
+            self.connect(c)
+
+    # -------------------------------------------------------------------------
+
+
+    # find the entrances of one edge again.
+    def set_border(self, border):
+        for a, b in self.inter.get(border, []):
+            self.links[a].discard(b)
+            self.links[b].discard(a)
+
+        self.inter[border] = self.find_entrances(border)
+        for a, b in self.inter[border]:
+            self.links.setdefault(a, set()).add(b)
+            self.links.setdefault(b, set()).add(a)
+
+    # -------------------------------------------------------------------------
+
+
+    # join up the nodes inside one cluster.
+    def connect(self, c):
+        """
+        Collect the cluster's nodes from the entrances on its
+        edges, find the in-cluster distance between every
+        pair of them, and drop its cached paths.
+        """
+
+        nodes = set()
+        for border in self.borders_of(c):
+            for a, b in self.inter[border]:
+                nodes.add(a if border[0] == c else b)
+
+        self.nodes[c] = nodes
+        self.intra[c] = {n: self.distances(c, n, nodes - {n}) for n in nodes}
+        self.refined[c] = {}
+
+    # -------------------------------------------------------------------------
+
+
+    # catch up with the map's edits.
+    def refresh(self):
+        """
+        Redo the entrances on the cluster edges that changed
+        cells sit on, and the inside of every cluster that
+        has a changed cell or an edge that was redone. If the
+        map's change log no longer goes back far enough, the
+        whole graph is redone.
+        """
+
+        if self.version == self.m.version:
+            return
+
+        changed = self.m.changes_since(self.version)
+        if changed is None:
+            self.rebuild()
+            return
+
+        s, w, h = self.size, self.m.width, self.m.height
+        dirty = set()
+        borders = set()
+
+        for i in changed:
+            c = self.cluster_of(i)
+            cy, cx = c
+            y, x = divmod(i, w)
+            dirty.add(c)
+
+            # cells on a cluster edge can change its entrances.
+            if x % s == s - 1 and x + 1 < w:
+                borders.add((c, (cy, cx + 1)))
+            if x % s == 0 and x > 0:
+                borders.add(((cy, cx - 1), c))
+            if y % s == s - 1 and y + 1 < h:
+                borders.add((c, (cy + 1, cx)))
+            if y % s == 0 and y > 0:
+                borders.add(((cy - 1, cx), c))
+
+        for border in borders:
+            self.set_border(border)
+            dirty.update(border)
+
+        for c in dirty:
+            self.connect(c)
+
+        self.version = self.m.version
+
+    # -------------------------------------------------------------------------
+
+
+    # the cells of one hop of an abstract path.
+    def refine(self, a, b, cache=True):
+        """
+        Return the cells after a up to b. A hop across an
+        edge is one step, a hop inside a cluster is searched
+        for in it, and kept if cache is set.
+        """
+
+        if b in self.links.get(a, ()):
+            return [b]
+
+        c = self.cluster_of(a)
+        if cache and (a, b) in self.refined[c]:
+            self.hits += 1
+            return self.refined[c][(a, b)]
+
+        self.misses += 1
+        steps = self.walk(self.search(self.bounds(c), a, b), b)[1:]
+        if cache:
+            self.refined[c][(a, b)] = steps
+        return steps
+
+    # -------------------------------------------------------------------------
+
+
+    # find a path between two cells.
+    def path(self, start, goal):
+        """
+        Return the list of (y, x) cells from start to goal
+        (both (y, x) pairs), both included, or None if there
+        is no way between them.
+        """
+
+        self.refresh()
+
+        w = self.m.width
+        cells = self.m.map.data
+        space = self.m.space_val
+        s = start[0] * w + start[1]
+        g = goal[0] * w + goal[1]
+
+        if cells[s] != space or cells[g] != space:
+            return None
+        if s == g:
+            return [divmod(s, w)]
+
+        # cells in different groups are never joined.
+        labels = self.m.group_map.data
+        if labels[s] != labels[g]:
+            return None
+
+        cs, cg = self.cluster_of(s), self.cluster_of(g)
+
+        # in the same or neighboring clusters, try staying
+        # inside them first, the abstract graph would only
+        # take the long way round through the entrances.
+        box = self.around(cs, cg)
+        if box is not None:
+            parent = self.search(box, s, g)
+            if g in parent:
+                return [divmod(i, w) for i in self.walk(parent, g)]
+
+        # hook start and goal onto their clusters' nodes.
+        from_start = self.distances(cs, s, self.nodes[cs])
+        to_goal = self.distances(cg, g, self.nodes[cg])
+
+        def edges(n):
+            if n == s:
+                yield from from_start.items()
+            if n in to_goal:
+                yield g, to_goal[n]
+            if n in self.links:
+                for o in self.links[n]:
+                    yield o, 1
+                yield from self.intra[self.cluster_of(n)].get(n, {}).items()
+
+        gy, gx = divmod(g, w)
+
+        def guess(n):
+            y, x = divmod(n, w)
+            return abs(y - gy) + abs(x - gx)
+
+        # a* over the abstract graph.
+        cost = {s: 0}
+        came = {s: None}
+        heap = [(guess(s), 0, s)]
+
+        while heap:
+            _, d, n = heapq.heappop(heap)
+            if n == g:
+                break
+            if d != cost[n]:
+                continue
+            for o, step in edges(n):
+                if o not in cost or d + step < cost[o]:
+                    cost[o] = d + step
+                    came[o] = n
+                    heapq.heappush(heap, (d + step + guess(o), d + step, o))
+        else:
+            return None
+
+        # fill in each hop, only the hops between two nodes
+        # are worth caching.
+        hops = self.walk(came, g)
+        out = [s]
+        for a, b in zip(hops, hops[1:]):
+            out += self.refine(a, b, cache=a != s and b != g)
+
+        return [divmod(i, w) for i in out]
+
+# -----------------------------------------------------------------------------
@@ -0,0 +1,183 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+
+import sys
+import time
+import tracemalloc
+from contextlib import nullcontext
+
+# -----------------------------------------------------------------------------
+
+
+# handed out for every stage when a map has no profiler, so
+# turning profiling off costs one call and an empty with.
+NO_STAGE = nullcontext()
+
+# -----------------------------------------------------------------------------
+
+
+class Stage(object):
+    """
+    Times one stage of building a map, and hands the result
+    back to its profiler when the with block ends.
+    """
+
+    __slots__ = ('profiler', 'name', 'cells', 'start', 'blocks', 'traced')
+
+    # -------------------------------------------------------------------------
+
+
+    # constructor
+    def __init__(self, profiler, name, cells):
+        self.profiler = profiler
+        self.name = name
+        self.cells = cells
+
+    def __enter__(self):
+        self.traced = None
+        if tracemalloc.is_tracing():
+            self.traced = tracemalloc.get_traced_memory()[0]
+        self.blocks = sys.getallocatedblocks()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        seconds = time.perf_counter() - self.start
+        blocks = sys.getallocatedblocks() - self.blocks
+
+        # bytes are only known while tracemalloc is running.
+        size = None
+        if self.traced is not None:
+            size = tracemalloc.get_traced_memory()[0] - self.traced
+
+        self.profiler.emit({'type': 'stage', 'name': self.name,
+                            'seconds': seconds, 'cells': self.cells,
+                            'blocks': blocks, 'bytes': size})
+
+# -----------------------------------------------------------------------------
+
+
+class Profiler(object):
+    """
+    Collects the stages and counters of building maps. Each
+    stage records how long it took, how many cells it ran
+    over, and the change in allocated memory blocks (and
+    bytes, if tracemalloc is running). Events are kept for
+    summary() unless keep is off, and handed to the callback
+    if one is given, so they can be streamed as they happen.
+    """
+
+    # -------------------------------------------------------------------------
+
+
+    # constructor
+    def __init__(self, callback=None, keep=True):
+        self.callback = callback
+        self.keep = keep
+        self.events = []
+        self.counters = {}
+
+    # -------------------------------------------------------------------------
+
+
+    # start timing a stage.
+    def stage(self, name, cells=0):
+        """
+        Return a context manager that times the with block
+        as the named stage.
+        """
+
+        return Stage(self, name, cells)
+
+    # -------------------------------------------------------------------------
+
+
+    # add to a counter.
+    def count(self, name, n=1):
+        """
+        Add n to the named counter, such as the iterations
+        run or the groups found.
+        """
+
+        self.counters[name] = self.counters.get(name, 0) + n
+        self.emit({'type': 'counter', 'name': name, 'value': n})
+
+    # -------------------------------------------------------------------------
+
+
+    # record an event, and pass it on.
+    def emit(self, event):
+        if self.keep:
+            self.events += [event]
+        if self.callback is not None:
+            self.callback(event)
+
+    # -------------------------------------------------------------------------
+
+
+    # forget everything recorded so far.
+    def clear(self):
+        self.events = []
+        self.counters = {}
+
+    # -------------------------------------------------------------------------
+
+
+    # total up the time spent in each stage.
+    def totals(self):
+        """
+        Return a dict of stage name to [calls, seconds,
+        cells, blocks] summed over all recorded stages.
+        """
+
+        totals = {}
+
+        for e in self.events:
+            if e['type'] != 'stage':
+                continue
+            t = totals.setdefault(e['name'], [0, 0.0, 0, 0])
+            t[0] += 1
+            t[1] += e['seconds']
+            t[2] += e['cells']
+            t[3] += e['blocks']
+
+        return totals
+
+    # -------------------------------------------------------------------------
+
+
+    # write out a table of the stages, slowest first.
+    def summary(self):
+        """
+        Return a string with a line for every stage, sorted by
+        the time spent in it, followed by the counters.
+        """
+
+        totals = self.totals()
+        spent = sum(t[1] for t in totals.values()) or 1.0
+
+        lines = ['{:<16} {:>6} {:>10} {:>6} {:>12} {:>10}'.format(
+            'stage', 'calls', 'seconds', '%', 'cells', 'blocks')]
+
+        for name, (calls, seconds, cells, blocks) in sorted(
+                totals.items(), key=lambda t: -t[1][1]):
+            lines += ['{:<16} {:>6} {:>10.4f} {:>6.1f} {:>12} {:>10}'.format(
+                name, calls, seconds, 100 * seconds / spent, cells, blocks)]
+
+        for name, value in sorted(self.counters.items()):
+            lines += ['{:<16} {:>6}'.format(name, value)]
+
+        return '\n'.join(lines)
+
+# -----------------------------------------------------------------------------
@@ -0,0 +1,385 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+# Generating maps too big for one process, or for memory.
+# The cells live in a scratch file mapped into every worker,
+# as two planes that the passes flip between. The map is cut
+# into stripes of rows, and each worker plays the passes on
+# one stripe at a time, reading halo rows above and below it
+# from the plane the last round wrote, so the halos are
+# passed between stripes through the file. Each stripe is
+# then labelled on its own, the labels are stitched where
+# stripes touch, and the result is written out as a map file
+# (see NecroFile) that MapFile can read a window at a time.
+
+# -----------------------------------------------------------------------------
+
+
+import os
+import mmap
+import struct
+import random
+import hashlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import NecroFile
+import NecroNoise
+import NecroEngine
+import NecroGroups
+from NecroGrid import Grid, label_typecode
+from NecroMapObj import Map
+
+# -----------------------------------------------------------------------------
+
+
+# the noise is drawn in blocks of this many rows, each from
+# its own seed, so the map does not depend on the stripes.
+NOISE_ROWS = 64
+
+# about how many cells go in a stripe by default.
+STRIPE_CELLS = 1 << 22
+
+# -----------------------------------------------------------------------------
+
+
+# open a file for reading and writing through mmap.
+def open_mmap(path):
+    with open(path, 'r+b') as f:
+        return mmap.mmap(f.fileno(), 0)
+
+# -----------------------------------------------------------------------------
+
+
+# the seed of one block of noise rows.
+def block_seed(seed, block):
+    digest = hashlib.blake2b(struct.pack('<QQ', seed, block),
+                             digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+# -----------------------------------------------------------------------------
+
+
+# fill one block of rows with noise, run inside a worker.
+def noise_block(task):
+    scratch, h, w, block, seed, noise, density = task
+
+    y0 = block * NOISE_ROWS
+    y1 = min(h, y0 + NOISE_ROWS)
+    rng = random.Random(block_seed(seed, block))
+    cells = NecroNoise.make_noise(noise, rng, y1 - y0, w, density,
+                                  Map.wall_val, Map.space_val)
+
+    with open_mmap(scratch) as mm:
+        mm[y0*w:y1*w] = cells.tobytes()
+
+# -----------------------------------------------------------------------------
+
+
+# play some passes on one stripe, run inside a worker.
+def play_stripe(task):
+    """
+    Read the stripe's rows from the src plane with passes
+    halo rows above and below, play the passes on them, and
+    write the stripe's own rows into the dst plane. The halo
+    rows can be wrong by the end, but a wrong cell only
+    spreads a row per pass, so the stripe's rows are right.
+    Returns if any of the stripe's cells changed.
+    """
+
+    scratch, h, w, y0, y1, src, dst, passes, engine, rules = task
+
+    a, b = max(0, y0 - passes), min(h, y1 + passes)
+
+    with open_mmap(scratch) as mm:
+        grid = Grid(b - a, w, data=array('B', mm[src + a*w:src + b*w]))
+
+        m = Map.__new__(Map)
+        m.setup(b - a, w, engine, rules, 0)
+        m.map = grid
+        m.neighbors = m.get_neighbors()
+
+        for _ in range(0, passes):
+            if m.game_of_life() == 0:
+                break
+
+        old = mm[src + y0*w:src + y1*w]
+        new = grid.data[(y0 - a)*w:(y1 - a)*w].tobytes()
+        mm[dst + y0*w:dst + y1*w] = new
+
+    return old != new
+
+# -----------------------------------------------------------------------------
+
+
+# label the groups of one stripe, run inside a worker.
+def stripe_groups(scratch, w, y0, y1, src):
+    with open_mmap(scratch) as mm:
+        grid = Grid(y1 - y0, w, data=array('B', mm[src + y0*w:src + y1*w]))
+    return NecroGroups.label_groups(grid, Map.space_val)
+
+def label_stripe(task):
+    """
+    Label the stripe's groups, and return their count, sizes
+    and bounding boxes (in map rows), with the runs on the
+    stripe's first and last rows as (x0, x1, group number),
+    which is all the stitching needs.
+    """
+
+    scratch, w, y0, y1, src = task
+
+    groups = stripe_groups(scratch, w, y0, y1, src)
+    last = y1 - y0 - 1
+
+    sizes = array('q', [g.size for g in groups])
+    bboxes = array('q')
+    top, bottom = [], []
+
+    for k, g in enumerate(groups):
+        t, l, b, r = g.bbox
+        bboxes.extend((t + y0, l, b + y0, r))
+        for y, x0, x1 in g.runs:
+            if y == 0:
+                top += [(x0, x1, k)]
+            if y == last:
+                bottom += [(x0, x1, k)]
+
+    top.sort()
+    bottom.sort()
+    return len(groups), sizes, bboxes, top, bottom
+
+# -----------------------------------------------------------------------------
+
+
+# write one stripe's cells and labels out, run in a worker.
+def write_stripe(task):
+    """
+    Label the stripe again (cheaper than saving the runs),
+    give each group its stitched label, and write the cells
+    and labels into the map file.
+    """
+
+    scratch, out, w, y0, y1, src, cells_at, labels_at, typecode, mapping = task
+
+    groups = stripe_groups(scratch, w, y0, y1, src)
+
+    labels = Grid(y1 - y0, w, typecode)
+    for k, g in enumerate(groups):
+        for y, x0, x1 in g.runs:
+            labels.fill(y, x0, x1, mapping[k])
+
+    size = labels.data.itemsize
+    with open_mmap(scratch) as mm:
+        cells = mm[src + y0*w:src + y1*w]
+    with open_mmap(out) as mm:
+        mm[cells_at + y0*w:cells_at + y1*w] = cells
+        mm[labels_at + y0*w*size:labels_at + y1*w*size] = \
+            NecroFile.label_bytes(labels.data, typecode)
+
+# -----------------------------------------------------------------------------
+
+
+# join the groups of neighboring stripes into map groups.
+def stitch(labelled):
+    """
+    Union every group with the groups below it in the next
+    stripe that its bottom runs overlap, the lowest number
+    winning, so the groups keep the row major order that
+    label_groups gives a whole map. Returns the label of
+    every stripe's groups (as arrays), and the size and
+    bounding box of every map group.
+    """
+
+    base = [0]
+    for n, *_ in labelled:
+        base += [base[-1] + n]
+    total = base[-1]
+
+    parent = array('q', range(0, total))
+
+    def find(r):
+        while parent[r] != r:
+            parent[r] = parent[parent[r]]
+            r = parent[r]
+        return r
+
+    for s in range(0, len(labelled) - 1):
+        above, below = labelled[s][4], labelled[s + 1][3]
+
+        # walk both rows of runs left to right together.
+        j = 0
+        for x0, x1, k in above:
+            while j < len(below) and below[j][1] <= x0:
+                j += 1
+            i = j
+            while i < len(below) and below[i][0] < x1:
+                a, b = find(base[s] + k), find(base[s + 1] + below[i][2])
+                if a < b:
+                    parent[b] = a
+                elif b < a:
+                    parent[a] = b
+                i += 1
+
+    # number the roots in order, and sum up their groups.
+    final = array('q', [0]) * total
+    sizes = array('q')
+    bboxes = array('q')
+
+    for s, (n, s_sizes, s_bboxes, _, _) in enumerate(labelled):
+        for k in range(0, n):
+            i = base[s] + k
+            r = find(i)
+            if r == i:
+                sizes.append(0)
+                bboxes.extend(s_bboxes[4*k:4*k+4])
+                final[i] = len(sizes)
+            else:
+                final[i] = final[r]
+
+            g = final[i] - 1
+            sizes[g] += s_sizes[k]
+            t, l, b, rr = s_bboxes[4*k:4*k+4]
+            bboxes[4*g] = min(bboxes[4*g], t)
+            bboxes[4*g+1] = min(bboxes[4*g+1], l)
+            bboxes[4*g+2] = max(bboxes[4*g+2], b)
+            bboxes[4*g+3] = max(bboxes[4*g+3], rr)
+
+    mappings = [final[base[s]:base[s + 1]] for s in range(0, len(labelled))]
+    return mappings, sizes, bboxes
+
+# -----------------------------------------------------------------------------
+
+
+class StripeResult(object):
+    """
+    What generate_large made: the map file's path, and the
+    stats of the map, with the size and bounding box
+    (top, left, bottom, right) of every group, group n
+    being the n'th of sizes, and the n'th 4 of bboxes.
+    """
+
+    # constructor
+    def __init__(self, path, height, width, seed, iterations_run, num_alive,
+                 sizes, bboxes):
+        self.path = path
+        self.height = height
+        self.width = width
+        self.seed = seed
+        self.iterations_run = iterations_run
+        self.num_alive = num_alive
+        self.sizes = sizes
+        self.bboxes = bboxes
+
+    @property
+    def num_groups(self):
+        return len(self.sizes)
+
+    # open the map file to read windows out of it.
+    def open(self):
+        return NecroFile.MapFile(self.path)
+
+    def __str__(self):
+        return '[{} by {}] seed {} with {} spaces in {} groups'.format(
+            self.height, self.width, self.seed, self.num_alive,
+            self.num_groups)
+
+# -----------------------------------------------------------------------------
+
+
+# make a map of any size across a pool of processes.
+def generate_large(path, h, w, seed=None, workers=None, stripe_rows=None,
+                   halo=2, engine=None, rules=None, iterations=2,
+                   density=0.5, noise='white'):
+    """
+    Generate an h by w map into the map file at path, with
+    stripes of stripe_rows rows spread over workers
+    processes. Each round plays halo passes before the
+    stripes swap halos, stopping early once a round changes
+    nothing. The engine defaults to numpy if it is installed
+    and bitboard if not. Memory use is a few stripes per
+    worker, the cells and labels stay in files. Groups are
+    not connected. Returns a StripeResult.
+    """
+
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(32)
+    if engine is None:
+        engine = 'numpy' if NecroEngine.numpy else 'bitboard'
+
+    rules = NecroEngine.make_rules(rules)
+    workers = workers or os.cpu_count() or 1
+    stripe_rows = stripe_rows or max(1, STRIPE_CELLS // w)
+    halo = max(1, halo)
+
+    stripes = [(y, min(h, y + stripe_rows)) for y in range(0, h, stripe_rows)]
+    blocks = range(0, (h + NOISE_ROWS - 1) // NOISE_ROWS)
+
+    # the scratch file holds two planes of cells.
+    scratch = path + '.cells'
+    with open(scratch, 'wb') as f:
+        f.truncate(2 * h * w)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+
+            list(pool.map(noise_block, [(scratch, h, w, b, seed, noise,
+                                         density) for b in blocks]))
+
+            # play the rounds, flipping between the planes.
+            src, dst = 0, h * w
+            run = 0
+            while run < iterations:
+                passes = min(halo, iterations - run)
+                changed = list(pool.map(play_stripe, [
+                    (scratch, h, w, y0, y1, src, dst, passes, engine, rules)
+                    for y0, y1 in stripes]))
+                run += passes
+                src, dst = dst, src
+                if not any(changed):
+                    break
+
+            labelled = list(pool.map(label_stripe, [
+                (scratch, w, y0, y1, src) for y0, y1 in stripes]))
+            mappings, sizes, bboxes = stitch(labelled)
+
+            # lay the map file out, and fill it in by stripe.
+            typecode = label_typecode(len(sizes))
+            header = NecroFile.pack_header(h, w, seed, rules, run, typecode,
+                                           len(sizes))
+
+            cells_at = NecroFile.HEADER.size
+            labels_at = cells_at + h * w
+            with open(path, 'wb') as f:
+                f.write(header)
+                f.truncate(labels_at + h * w * array(typecode).itemsize)
+
+            list(pool.map(write_stripe, [
+                (scratch, path, w, y0, y1, src, cells_at, labels_at,
+                 typecode, array(typecode, mapping))
+                for (y0, y1), mapping in zip(stripes, mappings)]))
+
+    finally:
+        os.remove(scratch)
+
+    return StripeResult(path, h, w, seed, run, sum(sizes), sizes, bboxes)
+
+# -----------------------------------------------------------------------------
+
+
+# if this file is run
+if __name__ == '__main__':
+
+    result = generate_large('large.map', 4096, 4096)
+    print(result)
+
+# -----------------------------------------------------------------------------
@@ -0,0 +1,169 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+# Text renderers for maps. Every renderer is a generator that
+# yields one finished line at a time, so a map of any size
+# can be streamed out with write_lines in constant memory.
+# Each row is turned into chars with one translate (or one
+# lookup per cell for wide labels) and spaced out with one
+# join.
+
+# -----------------------------------------------------------------------------
+
+
+# the chars of a row, spaced out the way the printers do.
+def spaced(chars):
+    return ' '.join(chars) + ' '
+
+# -----------------------------------------------------------------------------
+
+
+# turn the rows of a grid into strings of chars.
+def row_chars(grid, chars):
+    """
+    Yield each row of the grid as a str, with a cell of
+    value v shown as chars[v]. Byte grids with one byte
+    chars are done with one translate per row.
+    """
+
+    if (grid.typecode == 'B' and len(chars) <= 256
+            and all(ord(c) < 256 for c in chars)):
+        table = bytes(ord(c) for c in chars) + bytes(256 - len(chars))
+        for row in grid:
+            yield row.tobytes().translate(table).decode('latin-1')
+    else:
+        for row in grid:
+            yield ''.join([chars[v] for v in row])
+
+# -----------------------------------------------------------------------------
+
+
+# the two header lines above a map.
+def header_lines(width, shift=0):
+    """
+    Yield the column numbers and the line of hyphens under
+    them, numbers counting from shift.
+    """
+
+    yield '   ' + spaced(str((i + shift) % 10) for i in range(0, width)) + '\n'
+    yield ' |' + '--' * width + '\n'
+
+# -----------------------------------------------------------------------------
+
+
+# the chars for every group label in a map.
+def group_chars(m):
+    return [m.group_char(label) for label in range(0, len(m.groups) + 1)]
+
+# -----------------------------------------------------------------------------
+
+
+# the chars for every cell value in a map, walls and spaces.
+def map_chars(m):
+    chars = [m.wall] * 256
+    chars[m.space_val] = m.space
+    return chars
+
+# -----------------------------------------------------------------------------
+
+
+# the lines of print_map.
+def map_lines(m):
+    """
+    Yield the headers, then every row of the map with its
+    row number and the wall and space chars.
+    """
+
+    yield from header_lines(m.width)
+
+    for j, row in enumerate(row_chars(m.map, map_chars(m))):
+        yield '{}| '.format(j % 10) + spaced(row) + '\n'
+
+# -----------------------------------------------------------------------------
+
+
+# the lines of print_neighbors.
+def neighbor_lines(m):
+    """
+    Yield the headers, then every row of neighbor counts,
+    numbered from 1 like print_neighbors always has.
+    """
+
+    yield from header_lines(m.width)
+
+    chars = [str(n) for n in range(0, 10)]
+
+    for j, row in enumerate(row_chars(m.neighbors, chars)):
+        yield '{}| '.format((1 + j) % 10) + spaced(row) + '\n'
+
+# -----------------------------------------------------------------------------
+
+
+# the lines of print_groups.
+def group_lines(m):
+    """
+    Yield the headers, then every row of the group map with
+    its row number and the group letters.
+    """
+
+    yield from header_lines(m.width)
+
+    for j, row in enumerate(row_chars(m.group_map, group_chars(m))):
+        yield '{}| '.format(j % 10) + spaced(row) + '\n'
+
+# -----------------------------------------------------------------------------
+
+
+# the lines of get_map_string, a boxed group map.
+def boxed_lines(m):
+    """
+    Yield the group map inside a box, with the rows and
+    columns numbered from 1. The last line has no newline.
+    """
+
+    yield '   ' + spaced(str((i % 10 + 1) % 10)
+                         for i in range(0, m.width)) + '\n'
+    yield ' |' + '--' * m.width + '-|\n'
+
+    for i, row in enumerate(row_chars(m.group_map, group_chars(m))):
+        yield str((i % 10 + 1) % 10) + '| ' + spaced(row) + '|\n'
+
+    yield ' |' + '--' * m.width + '-|'
+
+# -----------------------------------------------------------------------------
+
+
+# the lines of print_to_file, one per row of an array.
+def array_lines(rows, to_char=str):
+    """
+    Yield every row of an array with each item turned into
+    a str by to_char and followed by a space.
+    """
+
+    for row in rows:
+        yield spaced([to_char(item) for item in row]) + '\n'
+
+# -----------------------------------------------------------------------------
+
+
+# write lines out to a file-like object.
+def write_lines(lines, f):
+    """
+    Write every line to f as it is made, nothing is joined
+    up in memory first.
+    """
+
+    for line in lines:
+        f.write(line)
+
+# -----------------------------------------------------------------------------
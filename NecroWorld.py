@@ -0,0 +1,361 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+# A world with no edges, cut into square chunks that are
+# only made when they are first looked at. Each chunk's
+# noise comes from the world seed and the chunk's place, so
+# any chunk can be made at any time, in any order. To keep
+# the automaton seamless across chunk edges, a chunk is
+# grown inside a halo of its neighbors' noise one wider than
+# the number of passes, past which the passes cannot reach.
+
+# -----------------------------------------------------------------------------
+
+
+import os
+import struct
+import random
+import hashlib
+from collections import OrderedDict
+
+import NecroEngine
+import NecroFile
+import NecroNoise
+from NecroGrid import Grid
+from NecroMapObj import Map
+
+# -----------------------------------------------------------------------------
+
+
+class World(object):
+    """
+    An unbounded cave made of chunk_size square chunks,
+    named by their (cy, cx) place. Chunks are Maps, kept in
+    memory for the maxsize recently used ones. If a path is
+    given, chunks pushed out of memory are saved in that
+    folder and read back instead of made again, which also
+    keeps any edits made to them; without a path, edits to
+    a chunk are lost once it is pushed out.
+    Groups are found per chunk, and are not connected.
+    """
+
+    # -------------------------------------------------------------------------
+
+
+    # constructor
+    def __init__(self, seed, chunk_size=64, engine='python', rules=None,
+                 iterations=2, density=0.5, noise='white', maxsize=64,
+                 path=None):
+
+        if iterations + 1 > chunk_size:
+            raise ValueError('the halo for {} passes is wider than a chunk '
+                             'of {}'.format(iterations, chunk_size))
+
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.engine = engine
+        self.rules = NecroEngine.make_rules(rules)
+        self.iterations = iterations
+        self.density = density
+        self.noise = noise
+        self.maxsize = maxsize
+        self.path = path
+
+        self.chunks = OrderedDict()
+        self.noises = OrderedDict()
+
+        # the version of each chunk in memory that is the
+        # same as the one in its file, read or written.
+        self.on_disk = {}
+
+        # counters for how each chunk was served.
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    # -------------------------------------------------------------------------
+
+
+    # the settings a saved chunk has to match.
+    def key(self, cy, cx):
+        return (self.seed, self.chunk_size, str(self.rules), self.iterations,
+                float(self.density), self.noise, cy, cx)
+
+    # -------------------------------------------------------------------------
+
+
+    # the seed of one chunk.
+    def chunk_seed(self, cy, cx):
+        """
+        Mix the world seed and the chunk's place into the
+        chunk's own seed.
+        """
+
+        digest = hashlib.blake2b(struct.pack('<qqq', self.seed, cy, cx),
+                                 digest_size=8).digest()
+        return int.from_bytes(digest, 'little')
+
+    # -------------------------------------------------------------------------
+
+
+    # the starting noise of one chunk.
+    def chunk_noise(self, cy, cx):
+        """
+        Return the chunk's noise as an array of bytes. A
+        chunk's noise is used by all 9 chunks around it, so
+        the last few are kept.
+        """
+
+        noise = self.noises.get((cy, cx))
+        if noise is None:
+            n = self.chunk_size
+            noise = NecroNoise.make_noise(
+                self.noise, random.Random(self.chunk_seed(cy, cx)), n, n,
+                self.density, Map.wall_val, Map.space_val)
+
+            self.noises[(cy, cx)] = noise
+            while len(self.noises) > 16:
+                self.noises.popitem(last=False)
+
+        self.noises.move_to_end((cy, cx))
+        return noise
+
+    # -------------------------------------------------------------------------
+
+
+    # make a chunk from nothing.
+    def generate(self, cy, cx):
+        """
+        Lay the chunk's noise down with a halo of its
+        neighbors' noise around it, play the passes on the
+        whole thing, and keep the middle. A cell's value can
+        only be changed by cells one step away per pass, so
+        with a halo one wider than the passes, the middle and
+        the ring around it (which its neighbor counts need)
+        come out the same as if the whole world had been
+        played.
+        """
+
+        n = self.chunk_size
+        halo = self.iterations + 1
+        size = n + 2 * halo
+
+        grid = Grid(size, size)
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                noise = self.chunk_noise(cy + dy, cx + dx)
+
+                # the part of that chunk inside the halo, its
+                # cell y, x lands on y + oy, x + ox.
+                oy, ox = n * dy + halo, n * dx + halo
+                y0, y1 = max(0, -oy), min(n, size - oy)
+                x0, x1 = max(0, -ox), min(n, size - ox)
+
+                for y in range(y0, y1):
+                    start = (y + oy) * size + x0 + ox
+                    grid.data[start:start + x1 - x0] = \
+                        noise[y * n + x0:y * n + x1]
+
+        # play a fixed number of passes, stopping at a fixed
+        # point only, so every chunk plays the same passes.
+        m = Map.__new__(Map)
+        m.setup(size, size, self.engine, self.rules, self.chunk_seed(cy, cx))
+        m.map = grid
+        m.neighbors = m.get_neighbors()
+
+        passes = 0
+        for _ in range(0, self.iterations):
+            passes += 1
+            if m.game_of_life() == 0:
+                break
+
+        # the middle, and its neighbor counts, which are
+        # right at the edges too thanks to the halo.
+        cells = Grid(n, n)
+        neighbors = Grid(n, n)
+        for y in range(0, n):
+            start = (y + halo) * size + halo
+            cells.data[y*n:(y+1)*n] = grid.data[start:start + n]
+            neighbors.data[y*n:(y+1)*n] = m.neighbors.data[start:start + n]
+
+        return Map.from_grid(cells, self.engine, self.rules,
+                             self.chunk_seed(cy, cx), neighbors, passes)
+
+    # -------------------------------------------------------------------------
+
+
+    # get a chunk, making or loading it if need be.
+    def chunk(self, cy, cx):
+        """
+        Return the Map of chunk (cy, cx), from memory, then
+        from disk, and only then by generating it.
+        """
+
+        m = self.chunks.get((cy, cx))
+        if m is not None:
+            self.chunks.move_to_end((cy, cx))
+            self.hits += 1
+            return m
+
+        m = self.load(cy, cx)
+        if m is not None:
+            self.disk_hits += 1
+            self.on_disk[(cy, cx)] = m.version
+        else:
+            self.misses += 1
+            m = self.generate(cy, cx)
+
+        self.chunks[(cy, cx)] = m
+        while len(self.chunks) > self.maxsize:
+            (oy, ox), old = self.chunks.popitem(last=False)
+            self.save(oy, ox, old)
+            self.on_disk.pop((oy, ox), None)
+
+        return m
+
+    # -------------------------------------------------------------------------
+
+
+    # find the chunk a world cell is in.
+    def locate(self, y, x):
+        """
+        Return (cy, cx, ly, lx), the chunk holding world cell
+        y, x and the cell's place inside it.
+        """
+
+        cy, ly = divmod(y, self.chunk_size)
+        cx, lx = divmod(x, self.chunk_size)
+        return cy, cx, ly, lx
+
+    # -------------------------------------------------------------------------
+
+
+    # the value of a world cell.
+    def cell(self, y, x):
+        cy, cx, ly, lx = self.locate(y, x)
+        return self.chunk(cy, cx).map[ly][lx]
+
+    # -------------------------------------------------------------------------
+
+
+    # set the value of a world cell.
+    def set_cell(self, y, x, value):
+        """
+        Set world cell y, x through its chunk's Map.set_cells.
+        Neighbor counts across the chunk edge are not
+        carried over to the next chunk.
+        """
+
+        cy, cx, ly, lx = self.locate(y, x)
+        return self.chunk(cy, cx).set_cell(ly, lx, value)
+
+    # -------------------------------------------------------------------------
+
+
+    # copy out a window of the world.
+    def window(self, y0, x0, y1, x1):
+        """
+        Return a Grid of the world cells from y0, x0 up to
+        (but not including) y1, x1, over as many chunks as
+        it takes.
+        """
+
+        n = self.chunk_size
+        h, w = y1 - y0, x1 - x0
+        out = Grid(h, w)
+
+        for cy in range(y0 // n, (y1 - 1) // n + 1):
+            for cx in range(x0 // n, (x1 - 1) // n + 1):
+                cells = self.chunk(cy, cx).map.data
+
+                # the part of the window in this chunk.
+                ty0, ty1 = max(y0, cy * n), min(y1, cy * n + n)
+                tx0, tx1 = max(x0, cx * n), min(x1, cx * n + n)
+
+                for y in range(ty0, ty1):
+                    src = (y - cy * n) * n + tx0 - cx * n
+                    dst = (y - y0) * w + tx0 - x0
+                    out.data[dst:dst + tx1 - tx0] = \
+                        cells[src:src + tx1 - tx0]
+
+        return out
+
+    # -------------------------------------------------------------------------
+
+
+    # the file a chunk is saved in.
+    def file_name(self, cy, cx):
+        return os.path.join(self.path, 'chunk_{}_{}.chunk'.format(cy, cx))
+
+    # -------------------------------------------------------------------------
+
+
+    # read a chunk back from disk.
+    def load(self, cy, cx):
+        """
+        Return the chunk saved on disk, or None if there is
+        no path or nothing saved for it by this world. The
+        file keeps the chunk's key, so one saved by another
+        world is never read back (see NecroFile.read_cells).
+        """
+
+        if self.path is None:
+            return None
+
+        entry = NecroFile.read_cells(self.file_name(cy, cx), self.key(cy, cx))
+        if entry is None:
+            return None
+
+        cells, neighbors, iterations_run = entry
+        n = self.chunk_size
+        return Map.from_grid(Grid(n, n, data=cells), self.engine, self.rules,
+                             self.chunk_seed(cy, cx),
+                             Grid(n, n, data=neighbors), iterations_run)
+
+    # -------------------------------------------------------------------------
+
+
+    # spill a chunk to disk.
+    def save(self, cy, cx, m):
+        """
+        Save a chunk that is being pushed out of memory as a
+        NecroFile cells file, which is written to a temp file
+        first so a half written one is never read back.
+        Chunks that are the same as their file, read from it
+        or written to it and not changed since, are not
+        written again.
+        """
+
+        if self.path is None:
+            return
+        if self.on_disk.get((cy, cx)) == m.version:
+            return
+
+        n = self.chunk_size
+        NecroFile.write_cells(self.file_name(cy, cx), self.key(cy, cx), n, n,
+                              m.map.tobytes(), m.neighbors.tobytes(),
+                              m.iterations_run)
+        self.on_disk[(cy, cx)] = m.version
+
+    # -------------------------------------------------------------------------
+
+
+    # save every chunk still in memory.
+    def flush(self):
+        for (cy, cx), m in self.chunks.items():
+            self.save(cy, cx, m)
+
+# -----------------------------------------------------------------------------
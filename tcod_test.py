@@ -11,6 +11,7 @@
 
 # -----------------------------------------------------------------------------
 
+import numpy
 import NecroMapObj
 import tcod as libtcod
 
@@ -32,21 +33,21 @@ screen_height = 50 + 1 # TODO kill the +1
 
 
 # print out a given string starting at y,x
-def putString(s, y, x):
+def putString(s, y, x, con=0):
     """
     """
 
     dx = 0
     for c in s:
         # print(c)
-        libtcod.console_put_char(0, x+dx, y, str(c), libtcod.BKGND_NONE)
+        libtcod.console_put_char(con, x+dx, y, str(c), libtcod.BKGND_NONE)
         dx += 1
 
 # -----------------------------------------------------------------------------
 
 
 # prints a box from y,x to dy-1,dx-1
-def setGuidelines(y, x, dy, dx):
+def setGuidelines(y, x, dy, dx, con=0):
     """
     """
 
@@ -60,81 +61,200 @@ def setGuidelines(y, x, dy, dx):
 
     # print out the horizantal sides.
     for _x in range(x, dx-1):
-        libtcod.console_put_char(0, _x, y, '-', libtcod.BKGND_NONE)
-        libtcod.console_put_char(0, _x, h, '-', libtcod.BKGND_NONE)
+        libtcod.console_put_char(con, _x, y, '-', libtcod.BKGND_NONE)
+        libtcod.console_put_char(con, _x, h, '-', libtcod.BKGND_NONE)
     
     # print out the vertical sides.
     for _y in range(y, dy-1):
-        libtcod.console_put_char(0, x, _y, '|', libtcod.BKGND_NONE)
-        libtcod.console_put_char(0, w, _y, '|', libtcod.BKGND_NONE)
+        libtcod.console_put_char(con, x, _y, '|', libtcod.BKGND_NONE)
+        libtcod.console_put_char(con, w, _y, '|', libtcod.BKGND_NONE)
     
     # print out +'s on the verticies.
-    libtcod.console_put_char(0, x, y, '+', libtcod.BKGND_NONE)
-    libtcod.console_put_char(0, w, y, '+', libtcod.BKGND_NONE)
-    libtcod.console_put_char(0, x, h, '+', libtcod.BKGND_NONE)
-    libtcod.console_put_char(0, w, h, '+', libtcod.BKGND_NONE)
+    libtcod.console_put_char(con, x, y, '+', libtcod.BKGND_NONE)
+    libtcod.console_put_char(con, w, y, '+', libtcod.BKGND_NONE)
+    libtcod.console_put_char(con, x, h, '+', libtcod.BKGND_NONE)
+    libtcod.console_put_char(con, w, h, '+', libtcod.BKGND_NONE)
 
 # -----------------------------------------------------------------------------
 
 
-# prints out a given obj's group map, with header and side
-# rulers.
-def setMap(obj, y, x):
+# prints out the static parts of the screen around a given
+# obj's group map, the rulers, boxes and panel names.
+def setChrome(con, obj, y, x):
     """
+    Draws everything that does not change from frame to 
+    frame onto the console (con), so it can be drawn once
+    and blitted.
     """
 
-    # pull the group map.
-    m = obj.group_map
-
     # print out the headers
     for _x in range(2, obj.width+2):
-        libtcod.console_put_char(0, _x+x, 0+y, str((_x-2) % 10), libtcod.BKGND_NONE)
+        libtcod.console_put_char(con, _x+x, 0+y, str((_x-2) % 10), libtcod.BKGND_NONE)
     for _x in range(2, obj.width+2):
-        libtcod.console_put_char(0, _x+x, 1+y, '-', libtcod.BKGND_NONE)
-
-    # reset the dy/dx variables
-    _x, _y = 2, 2
-    # for line in m.split('\n'):
-    for line in m:
-        libtcod.console_put_char(0, 0+x, _y+y, str((_y-2) % 10), libtcod.BKGND_NONE)
-        libtcod.console_put_char(0, 1+x, _y+y, '|', libtcod.BKGND_NONE)
-
-        # print all chars in the line.
-        for char in line:
-            libtcod.console_put_char(0, _x+x, _y+y, char, libtcod.BKGND_NONE)
-            _x += 1
+        libtcod.console_put_char(con, _x+x, 1+y, '-', libtcod.BKGND_NONE)
 
-        # reset _x to 2,
-        # inc _y.
-        _y += 1
-        _x = 2
+    # print out the side ruler
+    for _y in range(2, obj.height+2):
+        libtcod.console_put_char(con, 0+x, _y+y, str((_y-2) % 10), libtcod.BKGND_NONE)
+        libtcod.console_put_char(con, 1+x, _y+y, '|', libtcod.BKGND_NONE)
 
     # map guide numbers and spaces accound for 8x and 4y
     # map box 
     # [2y,2x -> 32y,56x]
-    setGuidelines(4-2, 4-2, 4+4+MAPh, 4+4+MAPw) 
+    setGuidelines(4-2, 4-2, 4+4+MAPh, 4+4+MAPw, con) 
     # box under map
     # ]34y,0x -> 35y,58x]
-    setGuidelines(2+4+4+MAPh, 0, 2+4+4+MAPh, 2+4+4+MAPw) 
+    setGuidelines(2+4+4+MAPh, 0, 2+4+4+MAPh, 2+4+4+MAPw, con) 
     # box right of map
     # [0y,58x -> 50y,58x]
-    setGuidelines(0, 2+4+4+MAPw, screen_height, 2+4+4+MAPw) 
+    setGuidelines(0, 2+4+4+MAPw, screen_height, 2+4+4+MAPw, con) 
 
     # guide ruler
     for i in range(0, screen_width): 
         if i%10 == 0 or i%10 == 5:
-            libtcod.console_put_char(0, i, 50, str(i % 10), libtcod.BKGND_NONE)        
+            libtcod.console_put_char(con, i, 50, str(i % 10), libtcod.BKGND_NONE)        
 
     # print out some strings
-    putString('Stats:', 1, 60)
-    putString('Equip:', 3, 60)
-    putString('Log:', 5, 60)
-    putString('Enemies:', 7, 60)
-    putString('Help:', 9, 60)
-    putString('Keys', 11, 60)
+    putString('Stats:', 1, 60, con)
+    putString('Equip:', 3, 60, con)
+    putString('Log:', 5, 60, con)
+    putString('Enemies:', 7, 60, con)
+    putString('Help:', 9, 60, con)
+    putString('Keys', 11, 60, con)
 
     # box around screen
-    setGuidelines(0, 0, screen_height-1, screen_width) # TODO kill the -1
+    setGuidelines(0, 0, screen_height-1, screen_width, con) # TODO kill the -1
+
+# -----------------------------------------------------------------------------
+
+
+class MapView(object):
+    """
+    Draws a map's group map onto the screen. The chrome and
+    the first full map are drawn to an offscreen console 
+    that is blitted to the root once, after that only the 
+    cells whose char changed are written, straight into the
+    root console's char and fg buffers with array masks.
+    Anything else drawn onto the map should go through 
+    put_char, so the map gets painted back over it.
+    """
+
+    # -------------------------------------------------------------------------
+
+
+    # constructor
+    def __init__(self, obj, y, x):
+        self.obj = obj
+
+        # where the first map cell lands, past the rulers.
+        self.top = y + 2
+        self.left = x + 2
+
+        # the part of the map that fits on the screen.
+        self.rows = max(0, min(obj.height, screen_height - self.top))
+        self.cols = max(0, min(obj.width, screen_width - self.left))
+
+        # the chars last written, nothing has been yet.
+        self.drawn = None
+        self.lut = None
+
+        # map cells drawn over by something else since the
+        # last refresh.
+        self.touched = numpy.zeros((self.rows, self.cols), dtype=bool)
+
+        self.offscreen = libtcod.console_new(screen_width, screen_height)
+        setChrome(self.offscreen, obj, y, x)
+
+    # -------------------------------------------------------------------------
+
+
+    # the chars the map should show right now.
+    def chars(self):
+        """
+        Looks every group label up in a table of char codes,
+        for the part of the map that is on screen.
+        """
+
+        g = self.obj.group_map
+        labels = numpy.frombuffer(g.data, dtype=g.typecode).reshape(
+            g.height, g.width)[:self.rows, :self.cols]
+
+        # remake the table if there are more labels now.
+        top = int(labels.max()) if labels.size else 0
+        if self.lut is None or top >= len(self.lut):
+            self.lut = numpy.array([ord(self.obj.group_char(l))
+                                    for l in range(0, top + 1)])
+
+        return self.lut[labels]
+
+    # -------------------------------------------------------------------------
+
+
+    # put the whole screen up.
+    def draw(self, root):
+        """
+        Writes the full map into the offscreen console, and 
+        blits it with the chrome onto the root console.
+        """
+
+        chars = self.chars()
+        area = (slice(self.top, self.top + self.rows),
+                slice(self.left, self.left + self.cols))
+
+        self.offscreen.ch[area] = chars
+        self.offscreen.fg[area] = libtcod.white
+
+        libtcod.console_blit(self.offscreen, 0, 0, screen_width,
+                             screen_height, root, 0, 0)
+        self.drawn = chars
+        self.touched[...] = False
+
+    # -------------------------------------------------------------------------
+
+
+    # put up only what changed.
+    def refresh(self, root):
+        """
+        Compares the map's chars with the last ones drawn,
+        and writes just the changed cells, and the ones drawn
+        over with put_char, into the root console. Returns 
+        how many cells were redrawn.
+        """
+
+        if self.drawn is None:
+            self.draw(root)
+            return self.rows * self.cols
+
+        chars = self.chars()
+        dirty = (chars != self.drawn) | self.touched
+        count = int(dirty.sum())
+
+        if count:
+            area = (slice(self.top, self.top + self.rows),
+                    slice(self.left, self.left + self.cols))
+            root.ch[area][dirty] = chars[dirty]
+            root.fg[area][dirty] = libtcod.white
+            self.drawn = chars
+            self.touched[...] = False
+
+        return count
+
+    # -------------------------------------------------------------------------
+
+
+    # draw a char onto the root console.
+    def put_char(self, root, x, y, c):
+        """
+        Puts c at x, y on the root console, and if that is
+        on the map, remembers the cell so the next refresh
+        paints the map back over it, as a full redraw would.
+        """
+
+        libtcod.console_put_char(root, x, y, c, libtcod.BKGND_NONE)
+
+        j, i = y - self.top, x - self.left
+        if 0 <= j < self.rows and 0 <= i < self.cols:
+            self.touched[j, i] = True
 
 # -----------------------------------------------------------------------------
 
@@ -147,25 +267,28 @@ def main():
     # TODO
     # tcod_test.py:37: DeprecationWarning: A renderer should be given, see the online documentation.
     # libtcod.console_init_root(screen_width, screen_height, 'NecroPlanter', False)
-    libtcod.console_init_root(screen_width, screen_height, 'NecroPlanter', False)
+    root = libtcod.console_init_root(screen_width, screen_height, 'NecroPlanter', False)
+
+    # TODO
+    # tcod_test.py:40: DeprecationWarning: Set the `con.default_fg` attribute instead.
+    # libtcod.console_set_default_foreground(0, libtcod.white)
+    libtcod.console_set_default_foreground(0, libtcod.white)
+
+    # the map starts at 4,4, its chrome is drawn once and
+    # the map cells only when they change.
+    view = MapView(mapObj, 4, 4)
 
     # TODO
     # tcod_test.py:39: DeprecationWarning: Use the tcod.event module to check for "QUIT" type events.
     # while not libtcod.console_is_window_closed():
     while not libtcod.console_is_window_closed():
+
+        view.put_char(root, 1, 1, '@')
+        view.put_char(root, 5, 5, '#')
+        view.put_char(root, 6, 6, '$')
         
-        # TODO
-        # tcod_test.py:40: DeprecationWarning: Set the `con.default_fg` attribute instead.
-        # libtcod.console_set_default_foreground(0, libtcod.white)
-        libtcod.console_set_default_foreground(0, libtcod.white)
-
-        libtcod.console_put_char(0, 1, 1, '@', libtcod.BKGND_NONE)
-        libtcod.console_put_char(0, 5, 5, '#', libtcod.BKGND_NONE)
-        libtcod.console_put_char(0, 6, 6, '$', libtcod.BKGND_NONE)
-        
-        # setMap(mapObj.print_groups())
-        # print the map, starting it at 4,4
-        setMap(mapObj, 4, 4)
+        # redraw the map cells that changed since last frame.
+        view.refresh(root)
 
         libtcod.console_flush()
 
@@ -0,0 +1,99 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+
+import pytest
+
+from NecroCatalog import MapCatalog, MAP_COLUMNS
+from NecroMapObj import Map
+
+# -----------------------------------------------------------------------------
+
+
+# a catalog with a few maps of two sizes in it.
+@pytest.fixture
+def catalog(tmp_path):
+    maps = [Map(20, 30, seed=s, connect=False) for s in range(0, 4)]
+    maps += [Map(15, 15, seed=s) for s in range(4, 6)]
+
+    with MapCatalog(str(tmp_path / 'maps.db')) as c:
+        ids = c.add_maps(maps[:5])
+        ids += [c.add_map(maps[5])]
+        yield c, ids, maps
+
+# -----------------------------------------------------------------------------
+
+
+# added maps get ids in order, and their stats are stored.
+def test_add(catalog):
+    c, ids, maps = catalog
+
+    assert ids == list(range(1, 7))
+    assert len(c) == 6
+
+    rows = c.find()
+    assert [r['id'] for r in rows] == ids
+    for r, m in zip(rows, maps):
+        assert set(r) == set(MAP_COLUMNS)
+        assert (r['height'], r['width'], r['seed']) == (m.height, m.width,
+                                                        m.seed)
+        assert r['num_alive'] == m.num_alive
+        assert r['num_groups'] == len(m.groups)
+        assert r['largest_group'] == max(len(g) for g in m.groups)
+
+    assert c.groups(ids[0]) == [(k + 1, len(g), g.bbox)
+                                for k, g in enumerate(maps[0].groups)]
+
+# -----------------------------------------------------------------------------
+
+
+# find matches every condition given, and nothing else.
+def test_find(catalog):
+    c, ids, maps = catalog
+
+    assert [r['id'] for r in c.find(height=15, width=15)] == ids[4:]
+    assert [r['id'] for r in c.find(num_groups=1)] == \
+        [i for i, m in zip(ids, maps) if len(m.groups) == 1]
+
+    openness = [m.num_alive / (m.height * m.width) for m in maps]
+    cut = sorted(openness)[3]
+    assert [r['id'] for r in c.find(min_openness=cut)] == \
+        [i for i, o in zip(ids, openness) if o >= cut]
+    assert [r['id'] for r in c.find(max_openness=cut, height=20)] == \
+        [i for i, o, m in zip(ids, openness, maps)
+         if o <= cut and m.height == 20]
+
+    assert len(c.find(limit=2)) == 2
+    assert c.find(num_groups=10**6) == []
+
+# -----------------------------------------------------------------------------
+
+
+# maps load back the same, and can be removed.
+def test_load_and_remove(catalog):
+    c, ids, maps = catalog
+
+    for i, m in zip(ids, maps):
+        n = c.load(i)
+        assert n.map == m.map
+        assert (n.seed, n.rules, n.iterations_run) == (m.seed, m.rules,
+                                                       m.iterations_run)
+
+    assert c.load(100) is None
+
+    c.remove(ids[0])
+    assert len(c) == 5
+    assert c.load(ids[0]) is None
+    assert c.groups(ids[0]) == []
+
+# -----------------------------------------------------------------------------
@@ -0,0 +1,56 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+
+import pytest
+
+from NecroMapObj import Map
+
+# -----------------------------------------------------------------------------
+
+
+# connecting leaves one group, and only digs through walls.
+@pytest.mark.parametrize('h, w, seed, density', [
+    (20, 30, 1, 0.5),
+    (48, 96, 2, 0.5),
+    (40, 40, 3, 0.6),
+    (1, 50, 4, 0.5),
+])
+def test_one_group(h, w, seed, density):
+    loose = Map(h, w, 'bitboard', seed=seed, density=density, connect=False)
+    m = Map(h, w, 'bitboard', seed=seed, density=density)
+
+    assert len(m.groups) == 1
+    assert m.groups[0].size == m.num_alive == m.map.count(m.space_val)
+
+    for a, b in zip(loose.map.data, m.map.data):
+        assert b == m.space_val or a == m.wall_val
+
+    # the counts were redone after digging.
+    assert m.neighbors == m.get_neighbors()
+
+# -----------------------------------------------------------------------------
+
+
+# a map with nothing to join is left alone.
+def test_nothing_to_join():
+    m = Map(10, 10, 'bitboard', seed=1, iterations=0, connect=False)
+    for y in range(0, 10):
+        m.map.fill(y, 0, 10, m.wall_val)
+    m.map[5][5] = m.space_val
+    m.update_map()
+
+    assert not m.connect_groups()
+    assert len(m.groups) == 1
+
+# -----------------------------------------------------------------------------
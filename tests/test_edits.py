@@ -0,0 +1,157 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+
+import random
+
+import pytest
+
+from NecroMapObj import Map
+
+# -----------------------------------------------------------------------------
+
+
+# the cells of every group, as a set of frozensets.
+def partition(m):
+    w = m.width
+    return set(frozenset(y * w + x for y, x0, x1 in g.runs
+                         for x in range(x0, x1)) for g in m.groups)
+
+# the cells under every group label, as a set of frozensets.
+def label_partition(m):
+    cells = {}
+    for i, label in enumerate(m.group_map.data):
+        if label:
+            cells.setdefault(label, set()).add(i)
+    return set(frozenset(c) for c in cells.values())
+
+# -----------------------------------------------------------------------------
+
+
+# check an edited map against one rebuilt from its cells.
+def check(m):
+    fresh = Map.from_grid(m.map.copy())
+
+    assert m.neighbors == fresh.neighbors
+    assert m.num_alive == fresh.num_alive
+    assert partition(m) == partition(fresh)
+    assert label_partition(m) == partition(fresh)
+    assert list(m.indices(m.wall_val)) == list(fresh.indices(m.wall_val))
+    assert list(m.indices(m.space_val)) == list(fresh.indices(m.space_val))
+
+    for k, g in enumerate(m.groups):
+        assert g.size == sum(x1 - x0 for _, x0, x1 in g.runs)
+        ys = [y for y, _, _ in g.runs]
+        xs = [x for _, x0, x1 in g.runs for x in (x0, x1 - 1)]
+        assert g.bbox == (min(ys), min(xs), max(ys), max(xs))
+        y, x0, _ = g.runs[0]
+        assert m.group_map[y][x0] == k + 1
+
+# -----------------------------------------------------------------------------
+
+
+# random edits give the same map as a full rebuild.
+@pytest.mark.parametrize('seed', range(0, 6))
+def test_random_edits(seed):
+    rng = random.Random(seed)
+    m = Map(30, 40, iterations=3, seed=seed, connect=False)
+
+    # make the cached views first, they are kept up to date.
+    m.walls, m.spaces
+
+    for _ in range(0, 25):
+        cells = [(rng.randrange(0, 30), rng.randrange(0, 40))
+                 for _ in range(0, rng.randrange(1, 8))]
+        m.set_cells(cells, rng.choice((m.wall_val, m.space_val)))
+        check(m)
+
+# -----------------------------------------------------------------------------
+
+
+# cutting a corridor splits its group, and filling it rejoins it.
+def test_split_and_join():
+    m = Map.from_grid(Map(9, 9, iterations=0, seed=1).map.copy())
+    m.open_cells([(y, x) for y in range(0, 9) for x in range(0, 9)])
+    check(m)
+    assert len(m.groups) == 1
+
+    wall = [(4, x) for x in range(0, 9)]
+    assert len(m.close_cells(wall)) == 9
+    check(m)
+    assert len(m.groups) == 2
+
+    m.open_cells([(4, 4)])
+    check(m)
+    assert len(m.groups) == 1
+
+# -----------------------------------------------------------------------------
+
+
+# edits are logged, and only the given cells change.
+def test_changes_logged():
+    m = Map(20, 20, iterations=2, seed=2, connect=False)
+    m.walls
+
+    i = m.map.data.index(m.wall_val)
+    version = m.version
+    assert m.open_cells([i]) == [i]
+    assert m.open_cells([i]) == []
+    assert m.changes_since(version) == {i}
+
+    with pytest.raises(ValueError):
+        m.set_cells([i], 7)
+    with pytest.raises(IndexError):
+        m.set_cell(20, 0, m.space_val)
+
+# -----------------------------------------------------------------------------
+
+
+# the incremental engine keeps up with edits between passes.
+def test_edits_between_passes():
+    rng = random.Random(9)
+    a = Map(30, 30, 'incremental', iterations=2, seed=3, connect=False)
+    b = Map(30, 30, 'python', iterations=2, seed=3, connect=False)
+
+    for _ in range(0, 8):
+        cells = [(rng.randrange(0, 30), rng.randrange(0, 30))
+                 for _ in range(0, 4)]
+        value = rng.choice((a.wall_val, a.space_val))
+        a.set_cells(cells, value)
+        b.set_cells(cells, value)
+
+        assert a.game_of_life() == b.game_of_life()
+        assert a.map == b.map
+        assert a.neighbors == b.neighbors
+        a.update_map()
+        b.update_map()
+
+# -----------------------------------------------------------------------------
+
+
+# edits straight after a pass find the groups again first.
+@pytest.mark.parametrize('seed', range(0, 4))
+def test_edits_after_pass(seed):
+    rng = random.Random(seed)
+    m = Map(30, 40, seed=seed, connect=False)
+
+    for _ in range(0, 3):
+        m.game_of_life()
+        cells = [(rng.randrange(0, 30), rng.randrange(0, 40))
+                 for _ in range(0, 6)]
+        m.set_cells(cells, rng.choice((m.wall_val, m.space_val)))
+        check(m)
+
+    m.set_cells([(0, 3)], m.wall_val)
+    check(m)
+
+# -----------------------------------------------------------------------------
@@ -0,0 +1,82 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+
+import pytest
+
+import NecroEngine
+from NecroMapObj import Map
+
+# -----------------------------------------------------------------------------
+
+
+# every engine that can run here, numpy only if installed.
+ENGINES = [name for name in sorted(NecroEngine.ENGINES)
+           if name != 'numpy' or NecroEngine.numpy is not None]
+
+# -----------------------------------------------------------------------------
+
+
+# every engine makes the same map as the python one.
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('h, w, seed, rules', [
+    (1, 1, 1, None),
+    (7, 13, 2, None),
+    (40, 31, 3, None),
+    (33, 65, 4, 'B5678/S45678'),
+    (25, 25, 5, 'B3/S23'),
+])
+def test_same_map(engine, h, w, seed, rules):
+    ref = Map(h, w, 'python', rules, iterations=5, seed=seed, connect=False)
+    m = Map(h, w, engine, rules, iterations=5, seed=seed, connect=False)
+
+    assert m.map == ref.map
+    assert m.neighbors == ref.neighbors
+    assert m.iterations_run == ref.iterations_run
+    assert m.group_map == ref.group_map
+
+# -----------------------------------------------------------------------------
+
+
+# the engines agree pass by pass, change counts included.
+@pytest.mark.parametrize('engine', ENGINES)
+def test_same_passes(engine):
+    ref = Map(30, 45, 'python', iterations=0, seed=6, connect=False)
+    m = Map.from_grid(ref.map.copy(), engine)
+
+    for _ in range(0, 6):
+        assert m.game_of_life() == ref.game_of_life()
+        assert m.map == ref.map
+        assert m.neighbors == ref.neighbors
+
+# -----------------------------------------------------------------------------
+
+
+# an unknown engine name is refused.
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        NecroEngine.get_engine('nope')
+
+# -----------------------------------------------------------------------------
+
+
+# a map that flips back to where it started stops on it.
+def test_cycle_from_start():
+    m = Map(8, 8, 'python', 'B012345678/S', iterations=0, seed=1,
+            connect=False)
+    start = m.map.copy()
+
+    assert m.run_automaton(10) == 2
+    assert m.map == start
+
+# -----------------------------------------------------------------------------
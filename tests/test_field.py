@@ -0,0 +1,89 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+
+import random
+
+import pytest
+
+import NecroField
+from NecroMapObj import Map
+
+# -----------------------------------------------------------------------------
+
+
+# moved sources give the same distances as a new field.
+@pytest.mark.parametrize('max_distance', [None, 6])
+def test_update_matches_fresh(max_distance):
+    rng = random.Random(1)
+    m = Map(40, 50, seed=2)
+    spaces = [(c.y, c.x) for c in m.spaces]
+
+    sources = rng.sample(spaces, 3)
+    field = m.distance_field(sources, max_distance)
+
+    for _ in range(0, 30):
+        k = rng.randrange(0, len(sources))
+        new = rng.choice(spaces)
+        if new in sources:
+            continue
+        field.move(sources[k], new)
+        sources[k] = new
+
+        fresh = NecroField.DistanceField(m, sources, max_distance)
+        assert field.dist == fresh.dist
+
+    # adding and dropping sources works the same way.
+    sources = sources[:1] + rng.sample(spaces, 4)
+    field.update(sources)
+    fresh = NecroField.DistanceField(m, sources, max_distance)
+    assert field.dist == fresh.dist
+
+# -----------------------------------------------------------------------------
+
+
+# paths walk down the field one step at a time to a source.
+def test_path():
+    m = Map(30, 30, seed=3)
+    spaces = [(c.y, c.x) for c in m.spaces]
+    source = spaces[len(spaces) // 2]
+    field = m.distance_field([source])
+
+    for y, x in spaces[::17]:
+        steps = field.path(y, x)
+        assert len(steps) == field.distance(y, x)
+        if steps:
+            assert steps[-1] == source
+        prev = (y, x)
+        for step in steps:
+            assert abs(step[0] - prev[0]) + abs(step[1] - prev[1]) == 1
+            assert field.distance(*step) == field.distance(*prev) - 1
+            prev = step
+
+    assert field.path(*source) == []
+    assert field.step(*source, away=True) is not None
+
+# -----------------------------------------------------------------------------
+
+
+# sources have to be spaces of the map.
+def test_bad_source():
+    m = Map(20, 20, seed=4)
+    wall = m.map.data.index(m.wall_val)
+
+    with pytest.raises(ValueError):
+        m.distance_field([wall])
+    with pytest.raises(ValueError):
+        m.distance_field([(20, 0)])
+
+# -----------------------------------------------------------------------------
@@ -0,0 +1,87 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+
+import pytest
+
+import NecroFile
+from NecroMapObj import Map
+
+# -----------------------------------------------------------------------------
+
+
+# a map comes back out of its file the same.
+@pytest.mark.parametrize('h, w, iterations, label_type', [
+    (30, 47, 2, 'B'),
+    (4, 1200, 0, 'H'),
+])
+def test_round_trip(tmp_path, h, w, iterations, label_type):
+    path = str(tmp_path / 'a.map')
+    m = Map(h, w, 'bitboard', 'B5678/S45678', iterations, seed=9,
+            connect=False)
+    m.write_to_file(path)
+
+    with NecroFile.MapFile(path) as f:
+        assert (f.height, f.width, f.seed) == (h, w, 9)
+        assert f.rules == m.rules
+        assert f.iterations_run == m.iterations_run
+        assert f.num_groups == len(m.groups)
+        assert f.label_type == label_type
+
+        assert f.cells() == m.map
+        assert f.labels().tolist() == m.group_map.tolist()
+
+        for y in (0, h - 1):
+            assert bytes(f.row(y)) == bytes(m.map[y])
+            assert list(f.label_row(y)) == list(m.group_map[y])
+
+    n = Map.read_from_file(path)
+    assert n.map == m.map
+    assert (n.seed, n.rules, n.iterations_run) == (9, m.rules,
+                                                   m.iterations_run)
+
+# -----------------------------------------------------------------------------
+
+
+# windows are the same as slices of the map.
+def test_window(tmp_path):
+    path = str(tmp_path / 'a.map')
+    m = Map(25, 40, seed=4, connect=False)
+    m.write_to_file(path)
+
+    with NecroFile.MapFile(path) as f:
+        for y0, x0, y1, x1 in ((0, 0, 25, 40), (3, 5, 9, 31), (24, 39, 25, 40),
+                               (7, 7, 7, 12)):
+            cells = f.window(y0, x0, y1, x1)
+            labels = f.window(y0, x0, y1, x1, labels=True)
+            assert cells.tolist() == [row[x0:x1] for row in
+                                      m.map.tolist()[y0:y1]]
+            assert labels.tolist() == [row[x0:x1] for row in
+                                       m.group_map.tolist()[y0:y1]]
+
+# -----------------------------------------------------------------------------
+
+
+# files that are not whole map files are refused.
+def test_bad_files(tmp_path):
+    path = str(tmp_path / 'a.map')
+    Map(10, 10, seed=1).write_to_file(path)
+    data = open(path, 'rb').read()
+
+    for bad in (b'', data[:20], b'XXXX' + data[4:], data[:-1]):
+        with open(path, 'wb') as f:
+            f.write(bad)
+        with pytest.raises(ValueError):
+            NecroFile.MapFile(path)
+
+# -----------------------------------------------------------------------------
@@ -0,0 +1,76 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+
+from NecroFov import FovCache, field_of_view
+from NecroMapObj import Map
+
+# -----------------------------------------------------------------------------
+
+
+# the open cell nearest y, x.
+def open_near(m, y, x):
+    return min(((c.y, c.x) for c in m.spaces),
+               key=lambda c: abs(c[0] - y) + abs(c[1] - x))
+
+# -----------------------------------------------------------------------------
+
+
+# an edit only drops the views that could see it.
+def test_set_cells():
+    m = Map(40, 60, seed=5)
+    cache = FovCache(m)
+    near = open_near(m, 10, 10)
+    far = open_near(m, 30, 50)
+    radius = 5
+
+    cache.visible_many([near, far], radius)
+    assert cache.misses == 2
+
+    # close a cell next to near, well away from far.
+    y, x = near
+    cell = next(i for i in sorted(cache.visible(y, x, radius))
+                if i != y * m.width + x and m.map.data[i] == m.space_val)
+    m.set_cells([divmod(cell, m.width)], m.wall_val)
+
+    assert cache.visible(*near, radius) == field_of_view(m, *near, radius)
+    assert cache.visible(*far, radius) == field_of_view(m, *far, radius)
+    assert cache.misses == 3
+    assert cache.revalidated == 1
+
+    assert cache.visible(*far, radius) is cache.visible(*far, radius)
+    assert cache.hits >= 1
+
+# -----------------------------------------------------------------------------
+
+
+# rebuilding the map drops every view.
+def test_rebuild():
+    m = Map(40, 60, seed=6, connect=False)
+    cache = FovCache(m)
+    origins = [(y, x) for y in range(5, 40, 10) for x in range(5, 60, 10)]
+    radius = 6
+
+    cache.visible_many(origins, radius)
+
+    m.game_of_life()
+    for y, x in origins:
+        assert cache.visible(y, x, radius) == field_of_view(m, y, x, radius)
+
+    m.update_map()
+    for y, x in origins:
+        assert cache.visible(y, x, radius) == field_of_view(m, y, x, radius)
+
+    assert cache.revalidated == 0
+
+# -----------------------------------------------------------------------------
@@ -0,0 +1,128 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+
+import random
+from collections import deque
+
+import pytest
+
+import NecroPath
+from NecroMapObj import Map
+
+# -----------------------------------------------------------------------------
+
+
+# the length of the shortest path, or None.
+def shortest(m, s, g):
+    w = m.width
+    dist = {s: 0}
+    queue = deque([s])
+    while queue:
+        i = queue.popleft()
+        if i == g:
+            return dist[i]
+        y, x = divmod(i, w)
+        for j, ok in ((i - w, y > 0), (i + w, y < m.height - 1),
+                      (i - 1, x > 0), (i + 1, x < w - 1)):
+            if ok and j not in dist and m.map.data[j] == m.space_val:
+                dist[j] = dist[i] + 1
+                queue.append(j)
+    return None
+
+# check a path is made of open, adjacent cells from s to g.
+def check(m, p, s, g):
+    assert p[0] == s and p[-1] == g
+    for (y, x), (v, u) in zip(p, p[1:]):
+        assert abs(y - v) + abs(x - u) == 1
+        assert m.map[v][u] == m.space_val
+
+# -----------------------------------------------------------------------------
+
+
+# ask for paths between random open cells.
+def queries(pf, m, rng, n):
+    spaces = list(m.spaces)
+    w = m.width
+    for _ in range(0, n):
+        a, b = rng.choice(spaces), rng.choice(spaces)
+        p = pf.path((a.y, a.x), (b.y, b.x))
+        best = shortest(m, a.index(w), b.index(w))
+        assert (p is None) == (best is None)
+        if p is not None:
+            check(m, p, (a.y, a.x), (b.y, b.x))
+            assert len(p) - 1 >= best
+
+# -----------------------------------------------------------------------------
+
+
+# paths are sound on a map that is left alone.
+def test_paths():
+    m = Map(64, 80, seed=7, connect=False)
+    queries(NecroPath.PathFinder(m, 16), m, random.Random(1), 150)
+
+# -----------------------------------------------------------------------------
+
+
+# paths follow the map through automaton passes and rebuilds.
+def test_after_automaton():
+    m = Map(64, 80, iterations=0, seed=5, connect=False)
+    pf = NecroPath.PathFinder(m, 16)
+
+    m.run_automaton(3)
+    m.update_map()
+    queries(pf, m, random.Random(2), 150)
+
+    m.connect = True
+    m.update_map()
+    queries(pf, m, random.Random(3), 50)
+
+# -----------------------------------------------------------------------------
+
+
+# the graph kept up to date through edits is the same as a
+# new one.
+def test_after_edits():
+    rng = random.Random(4)
+    m = Map(64, 80, seed=3, connect=False)
+    pf = NecroPath.PathFinder(m, 16)
+
+    for _ in range(0, 10):
+        cells = [(rng.randrange(0, 64), rng.randrange(0, 80))
+                 for _ in range(0, 15)]
+        m.set_cells(cells, rng.choice((m.wall_val, m.space_val)))
+        queries(pf, m, rng, 10)
+
+        fresh = NecroPath.PathFinder(m, 16)
+        assert pf.inter == fresh.inter
+        assert pf.intra == fresh.intra
+
+# -----------------------------------------------------------------------------
+
+
+# cells next to each other across a cluster edge are one step
+# apart, not sent round through the entrances.
+@pytest.mark.parametrize('seed', range(0, 3))
+def test_across_edges(seed):
+    m = Map(64, 64, seed=seed, connect=False)
+    pf = NecroPath.PathFinder(m, 16)
+    space = m.space_val
+
+    for y in range(0, 64):
+        for x in range(15, 64, 16):
+            if x + 1 < 64 and m.map[y][x] == m.map[y][x + 1] == space:
+                assert pf.path((y, x), (y, x + 1)) == [(y, x), (y, x + 1)]
+            if x + 1 < 64 and m.map[x][y] == m.map[x + 1][y] == space:
+                assert pf.path((x, y), (x + 1, y)) == [(x, y), (x + 1, y)]
+
+# -----------------------------------------------------------------------------
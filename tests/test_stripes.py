@@ -0,0 +1,88 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+
+import os
+
+import pytest
+
+import NecroStripes
+from NecroMapObj import Map
+
+# -----------------------------------------------------------------------------
+
+
+# the map a single process makes from the same noise.
+def reference(noise, iterations, seed):
+    m = Map.__new__(Map)
+    m.setup(noise.height, noise.width, 'python', None, seed)
+    m.map = noise
+    m.neighbors = m.get_neighbors()
+
+    for _ in range(0, iterations):
+        if m.game_of_life() == 0:
+            break
+
+    return Map.from_grid(m.map.copy())
+
+# -----------------------------------------------------------------------------
+
+
+# the stripes give the same map, groups and labels as one
+# process does.
+@pytest.mark.parametrize('h, w, stripe_rows, halo, iterations, engine', [
+    (60, 47, 16, 2, 2, 'bitboard'),
+    (80, 32, 7, 3, 5, 'bitboard'),
+    (40, 30, 40, 2, 3, 'python'),
+    (45, 20, 1, 1, 2, 'incremental'),
+])
+def test_same_as_one_process(tmp_path, h, w, stripe_rows, halo, iterations,
+                             engine):
+    noise = NecroStripes.generate_large(
+        str(tmp_path / 'noise.map'), h, w, seed=11, workers=2,
+        stripe_rows=stripe_rows, iterations=0, engine=engine)
+    with noise.open() as f:
+        ref = reference(f.cells(), iterations, 11)
+
+    r = NecroStripes.generate_large(
+        str(tmp_path / 'large.map'), h, w, seed=11, workers=2,
+        stripe_rows=stripe_rows, halo=halo, iterations=iterations,
+        engine=engine)
+
+    with r.open() as f:
+        assert f.cells() == ref.map
+        assert f.labels().tolist() == ref.group_map.tolist()
+        assert f.num_groups == len(ref.groups)
+
+    assert list(r.sizes) == [g.size for g in ref.groups]
+    assert [tuple(r.bboxes[4*k:4*k+4]) for k in range(0, r.num_groups)] == \
+        [g.bbox for g in ref.groups]
+    assert r.num_alive == ref.num_alive
+    assert not os.path.exists(str(tmp_path / 'large.map') + '.cells')
+
+# -----------------------------------------------------------------------------
+
+
+# the map does not depend on how it is cut into stripes.
+def test_stripes_do_not_matter(tmp_path):
+    cells = []
+    for k, rows in enumerate((5, 13, 100)):
+        r = NecroStripes.generate_large(
+            str(tmp_path / '{}.map'.format(k)), 100, 40, seed=3, workers=2,
+            stripe_rows=rows, engine='bitboard')
+        with r.open() as f:
+            cells += [f.cells()]
+
+    assert cells[0] == cells[1] == cells[2]
+
+# -----------------------------------------------------------------------------
@@ -0,0 +1,116 @@
+#!/usr/local/bin/python3
+
+# -----------------------------------------------------------------------------
+
+"""
+   Copyright (c) 2019 Christopher Bartlett
+   [This program is licensed under the "MIT License"]
+   Please see the file LICENSE in the source
+   distribution of this software for license terms.
+"""
+
+# -----------------------------------------------------------------------------
+
+
+import os
+
+import pytest
+
+from NecroGrid import Grid
+from NecroMapObj import Map
+from NecroWorld import World
+
+# -----------------------------------------------------------------------------
+
+
+# play the noise of chunks 0 to k - 1 as one map, with a
+# ring of one chunk around them so their edges are right.
+def played(world, k):
+    n = world.chunk_size
+    size = (k + 2) * n
+
+    grid = Grid(size, size)
+    for cy in range(-1, k + 1):
+        for cx in range(-1, k + 1):
+            noise = world.chunk_noise(cy, cx)
+            for y in range(0, n):
+                start = ((cy + 1) * n + y) * size + (cx + 1) * n
+                grid.data[start:start + n] = noise[y * n:(y + 1) * n]
+
+    m = Map.__new__(Map)
+    m.setup(size, size, world.engine, world.rules, 0)
+    m.map = grid
+    m.neighbors = m.get_neighbors()
+    for _ in range(0, world.iterations):
+        m.game_of_life()
+
+    return m
+
+# -----------------------------------------------------------------------------
+
+
+# chunks meet up as if the world was played all at once.
+@pytest.mark.parametrize('iterations', [1, 3])
+def test_seams(iterations):
+    world = World(7, chunk_size=12, iterations=iterations)
+    n, k = world.chunk_size, 3
+    m = played(world, k)
+    size = m.width
+
+    window = world.window(0, 0, k * n, k * n)
+    for y in range(0, k * n):
+        start = (y + n) * size + n
+        assert window.data[y * k * n:(y + 1) * k * n] == \
+            m.map.data[start:start + k * n]
+
+    # the counts at a chunk's edge see the next chunk over.
+    for cy in range(0, k):
+        for cx in range(0, k):
+            counts = world.chunk(cy, cx).neighbors
+            for y in range(0, n):
+                start = ((cy + 1) * n + y) * size + (cx + 1) * n
+                assert counts.data[y * n:(y + 1) * n] == \
+                    m.neighbors.data[start:start + n]
+
+# -----------------------------------------------------------------------------
+
+
+# edits to a chunk last after it is pushed out and read back.
+def test_spill(tmp_path):
+    path = str(tmp_path)
+    world = World(3, chunk_size=16, maxsize=1, path=path)
+
+    value = world.cell(5, 5)
+    flipped = Map.wall_val if value == Map.space_val else Map.space_val
+    world.set_cell(5, 5, flipped)
+    before = world.chunk(0, 0)
+    cells, counts = before.map.copy(), before.neighbors.copy()
+
+    world.chunk(0, 1)
+    assert os.path.exists(world.file_name(0, 0))
+
+    after = world.chunk(0, 0)
+    assert world.disk_hits == 1
+    assert after is not before
+    assert after.map == cells
+    assert after.neighbors == counts
+    assert world.cell(5, 5) == flipped
+
+    # another world never reads this one's chunks.
+    other = World(4, chunk_size=16, maxsize=1, path=path)
+    other.chunk(0, 0)
+    assert other.disk_hits == 0
+
+    # nor is a file that was cut short.
+    name = world.file_name(0, 1)
+    with open(name, 'rb') as f:
+        data = f.read()
+    with open(name, 'wb') as f:
+        f.write(data[:-1])
+
+    fresh = World(3, chunk_size=16, maxsize=1, path=path)
+    fresh.chunk(0, 1)
+    assert fresh.disk_hits == 0
+    assert fresh.misses == 1
+
+# -----------------------------------------------------------------------------